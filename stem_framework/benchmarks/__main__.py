@@ -0,0 +1,49 @@
+"""
+Runs the benchmark suites and stores the results as JSON:
+
+    python -m benchmarks                        # all suites, results in benchmark_results/<time>.json
+    python -m benchmarks envelope --quick       # one suite with small sizes
+    python -m benchmarks --compare previous.json
+"""
+import json
+import argparse
+from datetime import datetime
+
+from . import bench_runners, bench_envelope, bench_meta, bench_zip_hdf5
+from .common import Results, compare
+
+SUITES = dict(runners=bench_runners, envelope=bench_envelope, meta=bench_meta, zip_hdf5=bench_zip_hdf5)
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Run benchmarks')
+    parser.add_argument('suites', nargs='*', metavar='SUITE',
+                        help=f"Suites to run, all by default: {', '.join(SUITES)}")
+    parser.add_argument('--quick', action='store_true', help='Small sizes and few repeats')
+    parser.add_argument('-o', '--output', metavar='PATH', help='Result file')
+    parser.add_argument('--compare', metavar='PATH', help='Previous result file to compare with')
+    return parser
+
+
+def main(argv=None):
+    parser = create_parser()
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.suites if name not in SUITES]
+    if unknown:
+        parser.error(f"unknown suites: {', '.join(unknown)}, choose from {', '.join(SUITES)}")
+    results = Results()
+    for name in args.suites or SUITES:
+        SUITES[name].run(results, quick=args.quick)
+    output = args.output or f"benchmark_results/{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    results.save(output)
+    for case in results.cases:
+        timing = f"{case['median']:.6f}s" if 'median' in case else case.get('error', '')
+        print(f"{case['suite']}.{case['name']} {case['params']} {timing}")
+    if args.compare:
+        with open(args.compare) as file:
+            print('\n'.join(compare(json.load(file), results.to_json())))
+    print(f'Results are saved to {output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""
+Envelope codec throughput: to_bytes, from_bytes and async_read at payload sizes from 1 Kb to 512 Mb.
+The copy savings of zero-copy parsing are the differences of from_bytes to from_bytes_copy
+and of read_into (a reused buffer) to read (a new bytearray per envelope).
+A size which fails (e.g. runs out of memory) is recorded with its error instead of the timings.
+"""
+import io
+import os
+import asyncio
+from typing import Any
+
+from stem.envelope import Envelope
+
+from .common import Results, measure
+
+KB = 1024
+MB = 1024 * KB
+SIZES = [KB, 64 * KB, MB, 16 * MB, 128 * MB, 512 * MB]
+QUICK_SIZES = [KB, 64 * KB, MB]
+META = dict(task='bench', index=0, shape=[1024], dtype='<f4')
+
+
+def payload(size: int) -> bytes:
+    """Incompressible bytes without generating all of them randomly."""
+    block = os.urandom(min(size, MB))
+    return (block * (size // len(block) + 1))[:size]
+
+
+async def _async_read(frame: bytes) -> Envelope:
+    reader = asyncio.StreamReader(limit=len(frame) + 1)
+    reader.feed_data(frame)
+    reader.feed_eof()
+    return await Envelope.async_read(reader)
+
+
+def _throughput(size: int, stats: dict[str, float]) -> dict[str, Any]:
+    return dict(mb_per_s=size / MB / stats['median']) if stats['median'] > 0 else {}
+
+
+def _run_size(results: Results, size: int, params: dict[str, Any]):
+    """Frames of one size, freed on return before the next size is allocated."""
+    repeat = 5 if size <= 16 * MB else 3
+    envelope = Envelope(dict(META), payload(size))
+    frame = envelope.to_bytes()
+    buffer = bytearray(size)
+    for name, func in [('to_bytes', envelope.to_bytes),
+                       ('from_bytes', lambda: Envelope.from_bytes(frame)),
+                       ('from_bytes_copy', lambda: Envelope.from_bytes(frame, copy=True)),
+                       ('read', lambda: Envelope.read(io.BytesIO(frame))),
+                       ('read_into', lambda: Envelope.read(io.BytesIO(frame), buffer)),
+                       ('async_read', lambda: asyncio.run(_async_read(frame)))]:
+        stats = measure(func, repeat=repeat)
+        results.add('envelope', name, params, stats, **_throughput(size, stats))
+
+
+def run(results: Results, quick: bool = False):
+    for size in QUICK_SIZES if quick else SIZES:
+        params = dict(size=size)
+        try:
+            _run_size(results, size, params)
+        except (MemoryError, OSError) as error:
+            results.add('envelope', 'error', params, error=f'{type(error).__name__}: {error}')
@@ -0,0 +1,35 @@
+"""
+Meta codecs of small RPC envelopes: encoding and decoding of the meta alone and the round trip of
+an envelope without data, for every meta format of the envelope header.
+"""
+from typing import Any
+
+from stem.envelope import Envelope, META_FORMATS, _encode_meta, _decode_meta
+
+from .common import Results, measure
+
+SMALL = dict(command='powerfullity')
+TASK = dict(command='run', task_path='workspace.module.task', meta=dict(index=12, scale=0.5, name="o'clock"))
+LARGE = dict(command='run', task_path='workspace.module.task',
+             meta=dict(channels=list(range(256)), labels={str(i): f'channel {i}' for i in range(64)}))
+METAS = dict(small=SMALL, task=TASK, large=LARGE)
+
+
+def _per_second(stats: dict[str, float]) -> dict[str, Any]:
+    return dict(ops_per_s=1 / stats['median']) if stats['median'] > 0 else {}
+
+
+def run(results: Results, quick: bool = False):
+    number = 1000 if quick else 10000
+    for meta_name, meta in METAS.items():
+        for meta_format in META_FORMATS.values():
+            params = dict(meta=meta_name, format=meta_format)
+            encoded = _encode_meta(meta, meta_format)
+            frame = Envelope(meta, meta_format=meta_format).to_bytes()
+            for name, func in [('encode', lambda: _encode_meta(meta, meta_format)),
+                               ('decode', lambda: _decode_meta(encoded, meta_format)),
+                               ('round_trip', lambda: Envelope.from_bytes(
+                                   Envelope(meta, meta_format=meta_format).to_bytes()))]:
+                stats = measure(func, repeat=3 if quick else 5, number=number)
+                results.add('meta', name, params, stats, bytes=len(encoded), frame_bytes=len(frame),
+                            **_per_second(stats))
@@ -0,0 +1,97 @@
+"""
+Every task runner on synthetic graphs of trivial tasks, so the numbers are the overhead of scheduling
+and passing results:
+
+- wide: n leaves reduced by one task
+- deep: a chain of n tasks
+- diamond: layers of 4 tasks, each depending on every task of the previous layer
+- pipeline: an iterator of n items through a chain of 16 map tasks, consumed by a sum
+"""
+from functools import partial
+from typing import Any, Iterator
+
+from stem.task import Task, FunctionTask, FunctionDataTask
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner, ProcessingRunner
+from stem.workspace import LocalWorkspace
+
+from .common import Results, measure
+
+# task functions live at module level, so the process runner can pickle the tasks by value
+PIPELINE_STAGES = 16
+
+
+def _constant(value: int, meta: Any) -> int:
+    return value
+
+
+def _range(items: int, meta: Any) -> Iterator[int]:
+    return iter(range(items))
+
+
+def _sum(meta: Any, **inputs: Any) -> int:
+    return sum(inputs.values())
+
+
+def _increment(meta: Any, **inputs: Any) -> int:
+    value, = inputs.values()
+    return value + 1
+
+
+def _increment_all(meta: Any, **inputs: Any) -> Iterator[int]:
+    stream, = inputs.values()
+    return (x + 1 for x in stream)
+
+
+def _consume(meta: Any, **inputs: Any) -> int:
+    stream, = inputs.values()
+    return sum(stream)
+
+
+def wide(n: int) -> Task:
+    leaves = tuple(FunctionDataTask(f'leaf_{i}', partial(_constant, i)) for i in range(n))
+    return FunctionTask('wide_root', _sum, leaves)
+
+
+def deep(n: int) -> Task:
+    task: Task = FunctionDataTask('deep_0', partial(_constant, 0))
+    for i in range(1, n):
+        task = FunctionTask(f'deep_{i}', _increment, (task,))
+    return task
+
+
+def diamond(n: int, width: int = 4) -> Task:
+    layer: tuple[Task, ...] = (FunctionDataTask('diamond_source', partial(_constant, 1)),)
+    for i in range(max(n // width, 1)):
+        layer = tuple(FunctionTask(f'diamond_{i}_{j}', _sum, layer) for j in range(width))
+    return FunctionTask('diamond_sink', _sum, layer)
+
+
+def pipeline(n: int) -> Task:
+    task: Task = FunctionDataTask('pipeline_source', partial(_range, n))
+    for i in range(PIPELINE_STAGES):
+        task = FunctionTask(f'pipeline_{i}', _increment_all, (task,))
+    return FunctionTask('pipeline_sink', _consume, (task,))
+
+
+SHAPES = dict(wide=wide, deep=deep, diamond=diamond, pipeline=pipeline)
+RUNNERS = {'simple': SimpleRunner, 'thread': ThreadingRunner, 'async': AsyncRunner, 'process': ProcessingRunner}
+
+
+def run(results: Results, quick: bool = False):
+    sizes = dict(wide=[16, 256], deep=[16, 256], diamond=[16, 256], pipeline=[1000, 100000])
+    if quick:
+        sizes = {shape: values[:1] for shape, values in sizes.items()}
+    for shape, values in sizes.items():
+        for n in values:
+            task = SHAPES[shape](n)
+            workspace = LocalWorkspace('bench', {task.name: task})
+            for runner_name, runner_type in RUNNERS.items():
+                task_master = TaskMaster(runner_type())
+
+                def execute():
+                    return task_master.execute({}, task, workspace).data
+
+                execute()  # resolves the graph and warms up
+                stats = measure(execute, repeat=3 if quick else 5)
+                results.add('runners', f'{shape}/{runner_name}', dict(n=n), stats, tasks=len(task_master.task_tree))
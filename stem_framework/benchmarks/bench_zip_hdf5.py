@@ -0,0 +1,38 @@
+"""
+zip_to_hdf5 on generated archives: every channel file holds rows of a 24 byte header and 1024 float32 values.
+"""
+import os
+import tempfile
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
+
+import numpy as np
+
+from stem.zip_hdf5 import zip_to_hdf5
+
+from .common import Results, measure
+
+HEAD_SIZE = 24
+ROW_VALUES = 1024
+
+
+def generate_archive(path: str, channels: int, rows: int, compression: int = ZIP_STORED, seed: int = 0):
+    generator = np.random.default_rng(seed)
+    with ZipFile(path, 'w', compression=compression) as archive:
+        for channel in range(channels):
+            values = generator.standard_normal((rows, ROW_VALUES), dtype=np.float32)
+            heads = np.zeros((rows, HEAD_SIZE), dtype=np.uint8)
+            archive.writestr(f'channel_{channel}.dat', np.hstack([heads, values.view(np.uint8)]).tobytes())
+
+
+def run(results: Results, quick: bool = False):
+    cases = [(4, 256)] if quick else [(4, 256), (8, 2048), (16, 4096)]
+    with tempfile.TemporaryDirectory() as directory:
+        for channels, rows in cases:
+            for compression, label in [(ZIP_STORED, 'stored'), (ZIP_DEFLATED, 'deflated')]:
+                zip_path = os.path.join(directory, f'{label}_{channels}_{rows}.zip')
+                hdf_path = os.path.join(directory, 'converted.hdf5')
+                generate_archive(zip_path, channels, rows, compression)
+                stats = measure(lambda: zip_to_hdf5(zip_path, hdf_path), repeat=3)
+                size = channels * rows * ROW_VALUES * 4
+                results.add('zip_hdf5', label, dict(channels=channels, rows=rows), stats,
+                            mb_per_s=size / 1024 / 1024 / stats['median'])
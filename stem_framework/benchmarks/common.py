@@ -0,0 +1,80 @@
+"""
+Timing helpers and the JSON format of benchmark results.
+A result file holds the environment of the run and a list of cases; every case is identified by
+its suite, name and parameters, so files of different runs can be compared case by case.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Callable, Optional, Any
+
+
+def measure(func: Callable[[], Any], repeat: int = 5, number: int = 1,
+            setup: Optional[Callable[[], Any]] = None) -> dict[str, float]:
+    """Seconds per call of func: the best, median and mean of repeat rounds of number calls."""
+    times = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    return dict(min=min(times), median=statistics.median(times), mean=statistics.fmean(times),
+                repeat=repeat, number=number)
+
+
+def environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return dict(timestamp=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                python=sys.version.split()[0], implementation=platform.python_implementation(),
+                platform=platform.platform(), cpu_count=os.cpu_count(), commit=commit)
+
+
+class Results:
+
+    def __init__(self):
+        self.environment = environment()
+        self.cases: list[dict[str, Any]] = []
+
+    def add(self, suite: str, name: str, params: dict[str, Any], stats: Optional[dict[str, float]] = None,
+            **extra: Any) -> dict[str, Any]:
+        case = dict(suite=suite, name=name, params=params, **(stats or {}), **extra)
+        self.cases.append(case)
+        return case
+
+    def to_json(self) -> dict[str, Any]:
+        return dict(environment=self.environment, cases=self.cases)
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.to_json(), file, indent=1)
+
+
+def case_key(case: dict[str, Any]) -> str:
+    return f"{case['suite']}.{case['name']}" + ''.join(f' {k}={v}' for k, v in sorted(case['params'].items()))
+
+
+def compare(old: dict[str, Any], new: dict[str, Any]) -> list[str]:
+    """Lines with the ratio of median times of cases present in both result files, > 1 is a slowdown."""
+    previous = {case_key(case): case for case in old['cases']}
+    lines = []
+    for case in new['cases']:
+        before = previous.get(case_key(case))
+        if before is None or 'median' not in before or 'median' not in case:
+            continue
+        ratio = case['median'] / before['median']
+        lines.append(f"{ratio:6.2f}x  {before['median']:.6f}s -> {case['median']:.6f}s  {case_key(case)}")
+    return lines
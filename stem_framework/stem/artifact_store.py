@@ -0,0 +1,209 @@
+"""
+Persistent content-addressed storage of task results.
+Every artifact is an envelope file named by a hash of the qualified task path, the code of the task
+and of all its dependencies, and the meta the task receives.
+"""
+import os
+import sys
+import mmap
+import pickle
+import hashlib
+import tempfile
+from types import CodeType, FunctionType
+from weakref import WeakKeyDictionary
+from collections.abc import Iterator
+from typing import Optional, Any
+
+from .meta import Meta, get_meta_attr
+from .task import Task
+from .task_tree import TaskNode
+from .envelope import Envelope
+from .cache import NOT_FOUND, is_cacheable, meta_fingerprint
+
+
+def _code_digest(code: CodeType, digest: "hashlib._Hash"):
+    digest.update(code.co_code)
+    digest.update(repr(code.co_names).encode('utf-8'))
+    for const in code.co_consts:
+        if isinstance(const, CodeType):
+            _code_digest(const, digest)
+        else:
+            digest.update(repr(const).encode('utf-8'))
+
+
+def code_fingerprint(task: Task) -> str:
+    """Hash of the code of a function task or of the methods defined by a task class."""
+    while hasattr(task, '_task'):  # ProxyTask
+        task = getattr(task, '_task')
+    digest = hashlib.blake2b(digest_size=16)
+    func = getattr(task, '_func', None)
+    if func is not None and hasattr(func, '__code__'):
+        _code_digest(func.__code__, digest)
+    else:
+        digest.update(type(task).__qualname__.encode('utf-8'))
+        for _, attr in sorted(vars(type(task)).items()):
+            if isinstance(attr, FunctionType):
+                _code_digest(attr.__code__, digest)
+    return digest.hexdigest()
+
+
+def _ndarray_type() -> Optional[type]:
+    # numpy is only needed if a result could be an array, in which case it is already imported
+    numpy = sys.modules.get('numpy')
+    return None if numpy is None else numpy.ndarray
+
+
+class ArtifactStore:
+    """
+    Directory of task results shared by all processes on the host.
+    Writes are atomic, reads are mmap-backed. Bytes and arrays are copied out of the map, so a result
+    has the same type whether it was computed or loaded; with zero_copy they are read-only views of the file
+    (the map is closed with the last view) and a stored result is also returned as such a view.
+    A task opts out with ``persist=False`` (or ``cache=False``) in its settings.
+    """
+    SUFFIX = '.env'
+
+    def __init__(self, path: str, max_bytes: Optional[int] = 4*1024*1024*1024, zero_copy: bool = False):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.zero_copy = zero_copy
+        self.hits = 0
+        self.misses = 0
+        self._fingerprints: WeakKeyDictionary[TaskNode, str] = WeakKeyDictionary()
+        os.makedirs(path, exist_ok=True)
+        self._size = sum(size for _, _, size in self._artifacts())
+
+    def node_fingerprint(self, task_node: TaskNode) -> str:
+        """Hash of the qualified task path and of the code of the node and all its dependencies."""
+        for node in task_node.topological_order:
+            if node not in self._fingerprints:
+                digest = hashlib.blake2b(node.qualified_path.encode('utf-8'), digest_size=16)
+                digest.update(code_fingerprint(node.task).encode('utf-8'))
+                for dependency in node.dependencies:
+                    digest.update(self._fingerprints[dependency].encode('utf-8'))
+                self._fingerprints[node] = digest.hexdigest()
+        return self._fingerprints[task_node]
+
+    def key(self, task_node: TaskNode, meta: Meta) -> Optional[str]:
+        settings = task_node.task.settings
+        if not is_cacheable(task_node) or (settings is not None and not get_meta_attr(settings, 'persist', True)):
+            return None
+        fingerprint = meta_fingerprint(meta)
+        if fingerprint is None:
+            return None
+        return hashlib.blake2b((self.node_fingerprint(task_node) + fingerprint).encode('utf-8'),
+                               digest_size=20).hexdigest()
+
+    def artifact_path(self, key: str) -> str:
+        return os.path.join(self.path, key[:2], key + self.SUFFIX)
+
+    def __contains__(self, key: str) -> bool:
+        return os.path.exists(self.artifact_path(key))
+
+    def get(self, key: str, default: Any = NOT_FOUND) -> Any:
+        path = self.artifact_path(key)
+        try:
+            value = self._load(path)
+            os.utime(path)  # mtime is the recency used by gc
+        except (FileNotFoundError, ValueError):
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def _load(self, path: str) -> Any:
+        with open(path, 'rb') as file:
+            buffer = mmap.mmap(file.fileno(), length=0, access=mmap.ACCESS_READ)
+        envelope = Envelope.from_bytes(memoryview(buffer))
+        value = self._decode(envelope.meta, envelope.data, copy=not self.zero_copy)
+        if not self.zero_copy:
+            del envelope  # the last view of the map
+            buffer.close()
+        return value
+
+    def put(self, key: str, value: Any) -> Any:
+        """Stores value and returns what the caller should use instead of it."""
+        if isinstance(value, Iterator):
+            value = list(value)
+            result = iter(value)
+        else:
+            result = value
+        try:
+            envelope = self._encode(value, is_iterator=result is not value)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return result
+        path = self.artifact_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                envelope.write_to(file)
+                file.flush()
+                os.fsync(file.fileno())
+            try:
+                replaced = os.path.getsize(path)
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self._size += os.path.getsize(path) - replaced
+        if self.max_bytes is not None and self._size > self.max_bytes:
+            self.gc()
+        if self.zero_copy and envelope.meta['format'] != 'pickle':
+            try:
+                return self._load(path)
+            except FileNotFoundError:  # removed by gc
+                pass
+        return result
+
+    def gc(self, max_bytes: Optional[int] = None) -> int:
+        """Removes least recently used artifacts until the store fits max_bytes. Returns removed count."""
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        artifacts = sorted(self._artifacts(), key=lambda artifact: artifact[1])
+        size, removed = sum(artifact[2] for artifact in artifacts), 0
+        for path, _, artifact_size in artifacts:
+            if max_bytes is None or size <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= artifact_size
+            removed += 1
+        self._size = size
+        return removed
+
+    def _artifacts(self) -> Iterator[tuple[str, float, int]]:
+        for shard in os.scandir(self.path):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.name.endswith(self.SUFFIX):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        yield entry.path, stat.st_mtime, stat.st_size
+
+    @staticmethod
+    def _encode(value: Any, is_iterator: bool) -> Envelope:
+        ndarray = _ndarray_type()
+        if ndarray is not None and type(value) is ndarray and not value.dtype.hasobject:
+            meta = dict(format='ndarray', dtype=value.dtype.str, shape=list(value.shape))
+            return Envelope(meta, value.tobytes())
+        if isinstance(value, bytes):
+            return Envelope(dict(format='bytes'), value)
+        meta = dict(format='pickle', iterator=is_iterator)
+        return Envelope(meta, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def _decode(meta: dict, data: memoryview, copy: bool = True) -> Any:
+        if meta['format'] == 'ndarray':
+            import numpy
+            array = numpy.frombuffer(data, dtype=meta['dtype']).reshape(meta['shape'])
+            return array.copy() if copy else array
+        if meta['format'] == 'bytes':
+            return bytes(data) if copy else data
+        value = pickle.loads(data)
+        return iter(value) if meta['iterator'] else value
@@ -0,0 +1,111 @@
+"""
+Batch mode of stream tasks: elements travel through the pipeline as NumPy chunks,
+so functions, predicates and reducers are applied to whole arrays instead of single values.
+"""
+from itertools import chain, islice
+from typing import Callable, Iterable, Iterator, Optional, Union, Any
+
+import numpy as np
+
+from stem.meta import Meta
+from stem.task import Task
+
+CHUNK_SIZE = 64 * 1024
+
+
+def chunked(iterable: Iterable, chunk_size: int = CHUNK_SIZE, dtype: Optional[np.dtype] = None) -> Iterator[np.ndarray]:
+    """
+    Turns a stream of scalars into one-dimensional arrays of chunk_size elements (the last one may be shorter).
+    A stream which already yields arrays is passed through as is. Without dtype it is inferred from
+    all elements of a chunk and promoted by the next chunks, so e.g. ints followed by floats are not truncated.
+    """
+    iterator = iter(iterable)
+    for first in iterator:
+        if isinstance(first, np.ndarray) and first.ndim > 0:
+            yield first
+            yield from iterator
+            return
+        iterator = chain((first,), iterator)
+        break
+    inferred = None
+    while True:
+        if dtype is not None:
+            chunk = np.fromiter(islice(iterator, chunk_size), dtype=dtype)
+        else:
+            chunk = np.asarray(list(islice(iterator, chunk_size)))
+            inferred = chunk.dtype if inferred is None else np.result_type(inferred, chunk.dtype)
+            chunk = chunk.astype(inferred, copy=False)
+        if len(chunk) == 0:
+            return
+        yield chunk
+
+
+def unchunked(chunks: Iterable[np.ndarray]) -> Iterator[Any]:
+    """Stream of scalars from a stream of chunks."""
+    for chunk in chunks:
+        yield from chunk
+
+
+class ChunkTask(Task[Iterator[np.ndarray]]):
+    def __init__(self, dependence: Union[str, "Task"], chunk_size: int = CHUNK_SIZE,
+                 dtype: Optional[np.dtype] = None):
+        self._name = 'chunk_' + dependence.name
+        self.dependencies = dependence
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+
+    def transform(self, meta: Meta, /, **kwargs: Any) -> Iterator[np.ndarray]:
+        return chunked(self.dependencies.transform(meta, **kwargs), self.chunk_size, self.dtype)
+
+
+class BatchMapTask(ChunkTask):
+    """Applies a vectorized func to every chunk."""
+
+    def __init__(self, func: Callable[[np.ndarray], np.ndarray], dependence: Union[str, "Task"],
+                 chunk_size: int = CHUNK_SIZE, dtype: Optional[np.dtype] = None):
+        super().__init__(dependence, chunk_size, dtype)
+        self._name = 'batch_map_' + dependence.name
+        self._func = func
+
+    def transform(self, meta: Meta, /, **kwargs: Any) -> Iterator[np.ndarray]:
+        for chunk in super().transform(meta, **kwargs):
+            yield self._func(chunk)
+
+
+class BatchFilterTask(ChunkTask):
+    """Keeps elements of every chunk where the vectorized key gives True."""
+
+    def __init__(self, key: Callable[[np.ndarray], np.ndarray], dependence: Union[str, "Task"],
+                 chunk_size: int = CHUNK_SIZE, dtype: Optional[np.dtype] = None):
+        super().__init__(dependence, chunk_size, dtype)
+        self._name = 'batch_filter_' + dependence.name
+        self._func = key
+
+    def transform(self, meta: Meta, /, **kwargs: Any) -> Iterator[np.ndarray]:
+        for chunk in super().transform(meta, **kwargs):
+            chunk = chunk[self._func(chunk)]
+            if len(chunk) != 0:
+                yield chunk
+
+
+class BatchReduceTask(ChunkTask):
+    """
+    Reduces the stream with a binary ufunc (np.add, np.maximum, ...): every chunk is reduced by func.reduce
+    and the partial results are combined by func. An empty stream raises TypeError, as functools.reduce does.
+    """
+
+    def __init__(self, func: np.ufunc, dependence: Union[str, "Task"],
+                 chunk_size: int = CHUNK_SIZE, dtype: Optional[np.dtype] = None):
+        super().__init__(dependence, chunk_size, dtype)
+        self._name = 'batch_reduce_' + dependence.name
+        self.func = func
+
+    def transform(self, meta: Meta, /, **kwargs: Any) -> Any:
+        chunks = super().transform(meta, **kwargs)
+        first = next(chunks, None)
+        if first is None:
+            raise TypeError(f'{self.name} of an empty stream')
+        value = self.func.reduce(first)
+        for chunk in chunks:
+            value = self.func(value, self.func.reduce(chunk))
+        return value
@@ -0,0 +1,146 @@
+"""
+In-memory memoization of task results.
+A result is identified by the qualified task path of its node and a fingerprint of the meta the node receives.
+"""
+import sys
+import json
+import hashlib
+import dataclasses
+from threading import Lock
+from itertools import chain
+from weakref import WeakKeyDictionary
+from collections import OrderedDict
+from collections.abc import Iterator
+from typing import Optional, Any
+
+from .meta import Meta, get_meta_attr
+from .task_tree import TaskNode
+
+NOT_FOUND = object()
+
+
+def _canonical(obj: Any) -> Any:
+    if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=repr)
+    if isinstance(obj, bytes):
+        return obj.hex()
+    raise TypeError(f'Object of type {type(obj).__name__} has no canonical form')
+
+
+def meta_fingerprint(meta: Meta) -> Optional[str]:
+    """Stable hash of meta, None if meta contains values without canonical JSON form."""
+    try:
+        dump = json.dumps(meta, default=_canonical, sort_keys=True, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return None
+    return hashlib.blake2b(dump.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def sizeof(obj: Any) -> int:
+    """Approximate size of obj in bytes, containers are measured one level deep."""
+    nbytes = getattr(obj, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(sys.getsizeof(item) for item in obj)
+    elif isinstance(obj, dict):
+        size += sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in obj.items())
+    return size
+
+
+def _opts_out(task_node: TaskNode) -> bool:
+    settings = task_node.task.settings
+    return settings is not None and not get_meta_attr(settings, 'cache', True)
+
+
+_cacheable: WeakKeyDictionary[TaskNode, bool] = WeakKeyDictionary()
+
+
+def is_cacheable(task_node: TaskNode) -> bool:
+    """False if the node or any node it depends on opts out: a stored result would freeze their output."""
+    cacheable = _cacheable.get(task_node)
+    if cacheable is None:
+        cacheable = _cacheable[task_node] = not any(_opts_out(node) for node in task_node.topological_order)
+    return cacheable
+
+
+class ResultCache:
+    """
+    LRU cache of task results bounded by number of entries and total size.
+    Iterator results are stored as lists and every hit gets a fresh iterator over them; an iterator
+    is not stored once its items exceed max_bytes. A task opts out with ``cache=False`` in its settings,
+    which also opts out every task depending on it.
+    """
+
+    def __init__(self, max_entries: Optional[int] = 1024, max_bytes: Optional[int] = 256*1024*1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[Any, bool, int]] = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @staticmethod
+    def key(task_node: TaskNode, meta: Meta) -> Optional[tuple[str, str]]:
+        if not is_cacheable(task_node):
+            return None
+        fingerprint = meta_fingerprint(meta)
+        return None if fingerprint is None else (task_node.qualified_path, fingerprint)
+
+    def get(self, key: tuple[str, str], default: Any = NOT_FOUND) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+        value, is_iterator, _ = entry
+        return iter(value) if is_iterator else value
+
+    def put(self, key: tuple[str, str], value: Any) -> Any:
+        """Stores value and returns what the caller should use instead of it."""
+        is_iterator = isinstance(value, Iterator)
+        if is_iterator:
+            items, size = [], sys.getsizeof([])
+            for item in value:
+                items.append(item)
+                size += sys.getsizeof(item) + 8  # and the pointer in the list
+                if self.max_bytes is not None and size > self.max_bytes:
+                    return chain(items, value)
+            value = items
+        size = sizeof(value)
+        with self._lock:
+            if self.max_bytes is None or size <= self.max_bytes:
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._size -= previous[2]
+                self._entries[key] = (value, is_iterator, size)
+                self._size += size
+                self._evict()
+        return iter(value) if is_iterator else value
+
+    def _evict(self):
+        while self._entries and (
+                (self.max_entries is not None and len(self._entries) > self.max_entries) or
+                (self.max_bytes is not None and self._size > self.max_bytes)):
+            _, (_, _, size) = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
@@ -1,6 +1,15 @@
+import os
+import sys
+import json
+import base64
 import argparse
 import cmd
+import dataclasses
+from collections.abc import Iterator
+from typing import Optional, Any, BinaryIO, TextIO
+
 from stem.workspace import IWorkspace
+from stem.manifest import open_workspace, DEFAULT_DIR
 
 
 def print_structure(workspace: IWorkspace, args: argparse.Namespace):
@@ -15,8 +24,96 @@ def print_structure(workspace: IWorkspace, args: argparse.Namespace):
     pretty(workspace.structure())
 
 
+class ResultEncoder(json.JSONEncoder):
+
+    def default(self, obj: Any) -> Any:
+        if hasattr(obj, 'tolist'):  # NumPy arrays and scalars
+            return obj.tolist()
+        if isinstance(obj, (bytes, bytearray, memoryview)):
+            return base64.b64encode(obj).decode('ascii')
+        if dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+            return dataclasses.asdict(obj)
+        if isinstance(obj, (set, frozenset, tuple)):
+            return list(obj)
+        return super().default(obj)
+
+
+def read_meta(meta: Optional[str]) -> dict:
+    if meta is None:
+        return {}
+    if os.path.isfile(meta):
+        with open(meta, 'r') as file:
+            return json.load(file)
+    return json.loads(meta)
+
+
+def create_runner(name: str, jobs: Optional[int] = None, cache_dir: Optional[str] = None):
+    from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner, ProcessingRunner
+    from stem.artifact_store import ArtifactStore
+    store = ArtifactStore(cache_dir) if cache_dir is not None else None
+    if name == 'thread':
+        return ThreadingRunner(store=store, max_workers=jobs)
+    if name == 'process':
+        return ProcessingRunner(store=store, max_workers=jobs)
+    if name == 'async':
+        from concurrent.futures import ThreadPoolExecutor
+        return AsyncRunner(store=store, executor=ThreadPoolExecutor(jobs) if jobs is not None else None)
+    return SimpleRunner(store=store)
+
+
+def _frame(task_path: str, index: Optional[int], value: Any):
+    from stem.envelope import Envelope
+    meta = dict(task=task_path) if index is None else dict(task=task_path, index=index)
+    if hasattr(value, 'tobytes') and hasattr(value, 'dtype') and not value.dtype.hasobject:
+        meta.update(format='ndarray', dtype=value.dtype.str, shape=list(getattr(value, 'shape', ())))
+        return Envelope(meta, value.tobytes())
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        meta.update(format='bytes')
+        return Envelope(meta, bytes(value))
+    meta.update(format='json')
+    return Envelope(meta, json.dumps(value, cls=ResultEncoder).encode('utf-8'))
+
+
+def write_result(result: Any, task_path: str, output_format: str = 'ndjson',
+                 output: Optional[TextIO] = None):
+    """
+    Writes the result to the output: an iterator item by item as the items are produced, as lines of JSON
+    or Envelope frames with the item index in the meta.
+    """
+    output = sys.stdout if output is None else output
+    binary: Optional[BinaryIO] = output.buffer if output_format == 'envelope' else None
+    items = enumerate(result) if isinstance(result, Iterator) else [(None, result)]
+    if binary is not None:
+        output.flush()
+    for index, item in items:
+        if binary is not None:
+            _frame(task_path, index, item).write_to(binary)
+            binary.flush()
+        else:
+            output.write(json.dumps(item, cls=ResultEncoder) + '\n')
+            output.flush()
+
+
 def run_task(workspace: IWorkspace, args: argparse.Namespace):
-    pass  # TODO()
+    # the path is checked against the manifest, the task code is imported only to run it
+    if not workspace.has_task(args.TASKPATH):
+        raise SystemExit(f'Task {args.TASKPATH} is not found in workspace {workspace.name}')
+    from stem.task_master import TaskMaster, TaskStatus
+
+    task = workspace.find_task(args.TASKPATH)
+    target = getattr(workspace, 'workspace', workspace)
+    runner = create_runner(args.runner, args.jobs, args.cache_dir)
+    try:
+        result = TaskMaster(runner).execute(read_meta(args.meta), task, target)
+        if result.status == TaskStatus.DEPENDENCIES_ERROR:
+            raise SystemExit(f'Dependencies of task {args.TASKPATH} are not resolved')
+        if result.status == TaskStatus.META_ERROR:
+            raise SystemExit(f'Wrong meta for task {args.TASKPATH}: {result.meta_errors.meta_error.error}')
+        write_result(result.data, args.TASKPATH, args.format)
+    finally:
+        executor = getattr(runner, 'executor', None)
+        if executor is not None:
+            executor.shutdown()
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -26,6 +123,10 @@ def create_parser() -> argparse.ArgumentParser:
         help='Add path to workspace or file for module workspace',
         required=True
     )
+    parser.add_argument(
+        '--manifest-dir', metavar='DIR', default=DEFAULT_DIR,
+        help='Directory of cached workspace manifests'
+    )
 
     subparsers = parser.add_subparsers(metavar='command')
     structure_parser = subparsers.add_parser('structure', help='Print workspace structure')
@@ -37,17 +138,31 @@ def create_parser() -> argparse.ArgumentParser:
         '-m', '--meta',
         metavar='META', help='Metadata for task or path to file with metadata in JSON format'
     )
+    run_parser.add_argument(
+        '-r', '--runner', choices=['simple', 'thread', 'async', 'process'], default='simple',
+        help='Task runner'
+    )
+    run_parser.add_argument(
+        '-j', '--jobs', type=int, metavar='N',
+        help='Number of workers of the thread, async and process runners'
+    )
+    run_parser.add_argument(
+        '-c', '--cache-dir', metavar='DIR',
+        help='Directory of persistent task results'
+    )
+    run_parser.add_argument(
+        '-f', '--format', choices=['ndjson', 'envelope'], default='ndjson',
+        help='Output format: lines of JSON or Envelope frames, an iterator result is written item by item'
+    )
     return parser
 
 
-def stem_cli_main():
+def stem_cli_main(argv: Optional[list[str]] = None):
     parser = create_parser()
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
     if hasattr(args, 'func'):
-        # after parsing, it's not a workspace, but a string.
-        # do we need to extract workspace from str as IWorkspace or to hope for best?
-        # Technically, we restored content needed for help outputs...
-        args.func(args.workspace, args)
+        # the workspace is backed by its manifest and imported only when a task is needed
+        args.func(open_workspace(args.workspace, args.manifest_dir), args)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,105 @@
+"""
+Recorded execution durations of tasks and critical path estimates based on them.
+"""
+import os
+import json
+import heapq
+import tempfile
+from threading import Lock
+from typing import Optional, Iterable, Callable, TypeVar, Hashable
+
+from .task_tree import TaskNode
+
+T = TypeVar("T", bound=Hashable)
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'stem', 'durations.json')
+
+
+class DurationHistory:
+    """
+    Exponential moving average of the duration of every task path, kept in a local JSON file.
+    Tasks without history are estimated by the mean of known durations.
+    """
+
+    def __init__(self, path: Optional[str] = DEFAULT_PATH, alpha: float = 0.3):
+        self.path = path
+        self.alpha = alpha
+        self._durations: dict[str, float] = {}
+        self._lock = Lock()
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as file:
+                self._durations = json.load(file)
+
+    def __contains__(self, task_path: str) -> bool:
+        return task_path in self._durations
+
+    def record(self, task_path: str, seconds: float):
+        with self._lock:
+            previous = self._durations.get(task_path)
+            self._durations[task_path] = seconds if previous is None else \
+                self.alpha * seconds + (1 - self.alpha) * previous
+
+    def estimate(self, task_path: str) -> float:
+        duration = self._durations.get(task_path)
+        if duration is not None:
+            return duration
+        if self._durations:
+            return sum(self._durations.values()) / len(self._durations)
+        return 1.0
+
+    def save(self):
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(descriptor, 'w') as file:
+                json.dump(self._durations, file)
+        os.replace(temp_path, self.path)
+
+    def ranks(self, order: Iterable[T], dependencies: Callable[[T], Iterable[T]],
+              path: Callable[[T], str]) -> dict[T, float]:
+        """
+        Remaining critical path of every item of a topological order: its own duration and the longest
+        chain of dependents up to the root. Ready items with the greatest rank should start first.
+        """
+        order = list(order)
+        ranks: dict[T, float] = {item: 0.0 for item in order}
+        for item in reversed(order):
+            ranks[item] += self.estimate(path(item))
+            for dependency in dependencies(item):
+                ranks[dependency] = max(ranks[dependency], ranks[item])
+        return ranks
+
+    def critical_path(self, task_node: TaskNode) -> float:
+        """Duration of the tree with unlimited workers."""
+        order = task_node.topological_order
+        return max(self.ranks(order, lambda node: node.dependencies, lambda node: node.path).values())
+
+    def makespan(self, task_node: TaskNode, max_workers: Optional[int] = None) -> float:
+        """Predicted duration of the tree on max_workers workers scheduled by critical path."""
+        if max_workers is None:
+            return self.critical_path(task_node)
+        order = task_node.topological_order
+        ranks = self.ranks(order, lambda node: node.dependencies, lambda node: node.path)
+        dependents: dict[TaskNode, list[TaskNode]] = {node: [] for node in order}
+        for node in order:
+            for dependency in node.dependencies:
+                dependents[dependency].append(node)
+        waiting = {node: len(node.dependencies) for node in order}
+        ready = [(-ranks[node], i, node) for i, node in enumerate(order) if waiting[node] == 0]
+        heapq.heapify(ready)
+        running: list[tuple[float, int, TaskNode]] = []
+        now, sequence = 0.0, len(order)
+        while ready or running:
+            while ready and len(running) < max_workers:
+                _, i, node = heapq.heappop(ready)
+                heapq.heappush(running, (now + self.estimate(node.path), i, node))
+            now, _, node = heapq.heappop(running)
+            for dependent in dependents[node]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    sequence += 1
+                    heapq.heappush(ready, (-ranks[dependent], sequence, dependent))
+        return now
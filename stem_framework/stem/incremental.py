@@ -0,0 +1,92 @@
+"""
+Incremental recomputation: a node is run again only if its own part of the meta or
+the outputs of its dependencies differ from the previous run.
+"""
+import pickle
+import hashlib
+import dataclasses
+from collections.abc import Iterator
+from typing import Optional, Any, TYPE_CHECKING
+
+from .cache import NOT_FOUND, meta_fingerprint
+from .task_tree import TaskNode
+
+if TYPE_CHECKING:
+    from .task_runner import TaskInstance
+
+
+def own_meta_fingerprint(instance: "TaskInstance") -> Optional[str]:
+    """Fingerprint of the meta without the slices passed down to the dependencies."""
+    meta = instance.meta
+    if dataclasses.is_dataclass(meta) and not isinstance(meta, type):
+        meta = dataclasses.asdict(meta)
+    if not isinstance(meta, dict):
+        return None
+    names = {dependency.task_node.task.name for dependency in instance.dependencies}
+    return meta_fingerprint({key: value for key, value in meta.items() if key not in names})
+
+
+def output_fingerprint(output: Any) -> Optional[str]:
+    try:
+        dump = pickle.dumps(output, protocol=pickle.HIGHEST_PROTOCOL)
+    except (pickle.PicklingError, TypeError, AttributeError):
+        return None
+    return hashlib.blake2b(dump, digest_size=16).hexdigest()
+
+
+class RunHistory:
+    """
+    Per node records of the previous run: own meta fingerprint, fingerprints of the inputs, the output
+    and its fingerprint. Iterator outputs are kept as lists. A run is framed by begin() and commit(),
+    records which were not used by the latest run are dropped.
+    """
+
+    def __init__(self):
+        self._records: dict[tuple[TaskNode, str], tuple[tuple[str, ...], Any, bool, Optional[str]]] = {}
+        self._current: dict[tuple[TaskNode, str], tuple[tuple[str, ...], Any, bool, Optional[str]]] = {}
+        self._fingerprints: dict[int, Optional[str]] = {}
+        self.reused = 0
+        self.recomputed = 0
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def begin(self):
+        self._current = {}
+        self._fingerprints = {}
+
+    def commit(self):
+        self._records = self._current
+        self._current = {}
+        self._fingerprints = {}
+
+    def _key(self, instance: "TaskInstance") -> tuple[Optional[tuple[TaskNode, str]], tuple[Optional[str], ...]]:
+        own = own_meta_fingerprint(instance)
+        inputs = tuple(self._fingerprints.get(id(dependency)) for dependency in instance.dependencies)
+        return (None if own is None else (instance.task_node, own)), inputs
+
+    def recall(self, instance: "TaskInstance") -> Any:
+        """The output of the previous run if the instance is clean, otherwise NOT_FOUND."""
+        key, inputs = self._key(instance)
+        record = None if key is None or None in inputs else self._records.get(key)
+        if record is None or record[0] != inputs:
+            return NOT_FOUND
+        self.reused += 1
+        self._current[key] = record
+        _, output, is_iterator, fingerprint = record
+        self._fingerprints[id(instance)] = fingerprint
+        return iter(output) if is_iterator else output
+
+    def record(self, instance: "TaskInstance", output: Any, computed: bool = True) -> Any:
+        """Remembers the output of the instance and returns what the caller should use instead of it."""
+        is_iterator = isinstance(output, Iterator)
+        if is_iterator:
+            output = list(output)
+        fingerprint = output_fingerprint(output)
+        key, inputs = self._key(instance)
+        self._fingerprints[id(instance)] = fingerprint
+        if key is not None:
+            self._current[key] = (inputs, output, is_iterator, fingerprint)
+        if computed:
+            self.recomputed += 1
+        return iter(output) if is_iterator else output
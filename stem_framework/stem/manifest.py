@@ -0,0 +1,222 @@
+"""
+Workspaces for the command line: a workspace is given by a file or module name with an optional
+workspace class, `path/to/tasks.py:IntWorkspace` or `package.tasks`.
+Its structure and task paths are kept in an on-disk manifest, so commands which only need them do not
+import the task code. A manifest is valid while the files of the workspace keep their mtime and size or,
+if those changed, their content hash.
+"""
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import importlib.util
+from importlib import import_module
+from types import ModuleType
+from functools import cached_property
+from typing import Optional, Any
+
+from .task import Task
+from .workspace import IWorkspace
+
+DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'stem', 'manifests')
+VERSION = 1
+
+
+def _split(spec: str) -> tuple[str, Optional[str]]:
+    source, _, workspace_name = spec.partition(':')
+    return source, workspace_name or None
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _file_state(path: str) -> dict[str, Any]:
+    stat = os.stat(path)
+    return dict(path=path, mtime_ns=stat.st_mtime_ns, size=stat.st_size, hash=_file_hash(path))
+
+
+def _is_local(path: Optional[str]) -> bool:
+    """Files of the user code, not of the standard library or installed packages."""
+    if path is None or not os.path.isfile(path):
+        return False
+    path = os.path.realpath(path)
+    prefixes = {os.path.realpath(prefix) for prefix in (sys.prefix, sys.base_prefix, sys.exec_prefix)}
+    return not any(path.startswith(prefix + os.sep) for prefix in prefixes) and 'site-packages' not in path
+
+
+def import_source(source: str) -> ModuleType:
+    """Imports a module by file path or by module name."""
+    if not source.endswith('.py'):
+        return import_module(source)
+    path = os.path.realpath(source)
+    name = os.path.splitext(os.path.basename(path))[0]
+    module = sys.modules.get(name)
+    if module is not None and os.path.realpath(getattr(module, '__file__', '') or '') == path:
+        return module
+    directory = os.path.dirname(path)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
+
+
+def load_workspace(spec: str) -> tuple[IWorkspace, list[str]]:
+    """Imports the workspace and returns it together with the local files loaded for it."""
+    source, workspace_name = _split(spec)
+    before = set(sys.modules)
+    module = import_source(source)
+    files = {getattr(module, '__file__', None)}
+    files.update(getattr(sys.modules[name], '__file__', None) for name in set(sys.modules) - before)
+    if workspace_name is None:
+        workspace = IWorkspace.module_workspace(module)
+    else:
+        workspace = getattr(module, workspace_name, None)
+        if workspace is None:
+            raise LookupError(f'Workspace {workspace_name} is not found in {source}')
+    return workspace, sorted(os.path.realpath(file) for file in files if _is_local(file))
+
+
+class WorkspaceManifest:
+    """Structure and task paths of a workspace with the states of the files it was built from."""
+
+    def __init__(self, spec: str, name: str, structure: dict, task_paths: list[str],
+                 files: list[dict[str, Any]]):
+        self.spec = spec
+        self.name = name
+        self.structure = structure
+        self.task_paths = task_paths
+        self.files = files
+        self.touched = False  # file states were refreshed by is_valid
+
+    @staticmethod
+    def build(spec: str, workspace: IWorkspace, files: list[str]) -> "WorkspaceManifest":
+        return WorkspaceManifest(spec, workspace.name, workspace.structure(), sorted(workspace.task_paths),
+                                 [_file_state(file) for file in files])
+
+    @staticmethod
+    def path(spec: str, directory: str = DEFAULT_DIR) -> str:
+        source, workspace_name = _split(spec)
+        if source.endswith('.py'):
+            source = os.path.realpath(source)
+        key = hashlib.blake2b(f'{source}:{workspace_name}'.encode(), digest_size=16).hexdigest()
+        return os.path.join(directory, key + '.json')
+
+    @staticmethod
+    def load(spec: str, directory: str = DEFAULT_DIR) -> Optional["WorkspaceManifest"]:
+        try:
+            with open(WorkspaceManifest.path(spec, directory), 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != VERSION or data.get('spec') != spec:
+            return None
+        return WorkspaceManifest(spec, data['name'], data['structure'], data['task_paths'], data['files'])
+
+    def save(self, directory: str = DEFAULT_DIR):
+        os.makedirs(directory, exist_ok=True)
+        data = dict(version=VERSION, spec=self.spec, name=self.name, structure=self.structure,
+                    task_paths=self.task_paths, files=self.files)
+        descriptor, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        with os.fdopen(descriptor, 'w') as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.path(self.spec, directory))
+
+    def is_valid(self) -> bool:
+        """Checks mtime and size of the files, the content hash is computed only for files which were touched."""
+        for state in self.files:
+            try:
+                stat = os.stat(state['path'])
+            except OSError:
+                return False
+            if stat.st_mtime_ns == state['mtime_ns'] and stat.st_size == state['size']:
+                continue
+            if stat.st_size != state['size'] or _file_hash(state['path']) != state['hash']:
+                return False
+            state['mtime_ns'] = stat.st_mtime_ns
+            self.touched = True
+        return True
+
+
+class LazyWorkspace(IWorkspace):
+    """
+    Workspace answering structure and task path questions from its manifest.
+    Tasks and sub-workspaces import the workspace on the first access.
+    """
+
+    def __init__(self, spec: str, manifest: WorkspaceManifest, workspace: Optional[IWorkspace] = None):
+        self.spec = spec
+        self.manifest = manifest
+        self._name = manifest.name
+        self._workspace = workspace
+
+    @property
+    def loaded(self) -> bool:
+        return self._workspace is not None
+
+    @property
+    def workspace(self) -> IWorkspace:
+        if self._workspace is None:
+            self._workspace, _ = load_workspace(self.spec)
+        return self._workspace
+
+    @property
+    def module_name(self) -> Optional[str]:
+        return self.workspace.module_name
+
+    @property
+    def tasks(self) -> dict[str, Task]:
+        return self.workspace.tasks
+
+    @property
+    def workspaces(self) -> set[IWorkspace]:
+        return self.workspace.workspaces
+
+    @property
+    def task_paths(self) -> list[str]:
+        return self.manifest.task_paths
+
+    @cached_property
+    def _task_path_set(self) -> set[str]:
+        return set(self.manifest.task_paths)
+
+    def has_task(self, task_path) -> bool:
+        return str(task_path) in self._task_path_set
+
+    def find_task(self, task_path) -> Optional[Task]:
+        return self.workspace.find_task(task_path) if self.has_task(task_path) else None
+
+    def get_workspace(self, name) -> Optional[IWorkspace]:
+        return self.workspace.get_workspace(name)
+
+    def structure(self) -> dict:
+        return self.manifest.structure
+
+
+def open_workspace(spec: str, directory: Optional[str] = DEFAULT_DIR) -> LazyWorkspace:
+    """
+    Workspace of the spec backed by its manifest. The workspace is imported only if the manifest is
+    missing or stale; a fresh manifest is saved then. Without directory manifests are not kept.
+    """
+    manifest = None if directory is None else WorkspaceManifest.load(spec, directory)
+    if manifest is not None and manifest.is_valid():
+        if manifest.touched:
+            manifest.save(directory)
+        return LazyWorkspace(spec, manifest)
+    workspace, files = load_workspace(spec)
+    manifest = WorkspaceManifest.build(spec, workspace, files)
+    if directory is not None:
+        manifest.save(directory)
+    return LazyWorkspace(spec, manifest, workspace)
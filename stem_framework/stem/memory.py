@@ -0,0 +1,88 @@
+"""
+Memory accounting of task runs: sizes of the results held by the runners, optional tracemalloc peaks
+of transforms and a memory budget. With a budget a pool runner starts a node only if the results it holds
+and the expected memory of the running nodes stay within the budget; a node starts anyway when
+nothing else runs, so a run always makes progress.
+"""
+import tracemalloc
+from threading import Lock
+from collections.abc import Iterator
+from typing import Optional, Any, Callable, Hashable
+
+from .cache import sizeof
+from .tee import SharedTee
+
+
+class MemoryAccount:
+    """
+    Per task path: the size of the last result and, with trace, the peak of memory allocated by the transform.
+    Peaks are measured by tracemalloc, which is process wide and slows allocations down: nodes running
+    at the same time add to each other's peaks, so enable it to diagnose rather than in production.
+    Tracing started by the account goes on until close, use the account as a context manager to stop it.
+    """
+
+    def __init__(self, budget: Optional[int] = None, trace: bool = False):
+        self.budget = budget
+        self.trace = trace
+        self.sizes: dict[str, int] = {}
+        self.peaks: dict[str, int] = {}
+        self.live = 0  # bytes of results held by runs
+        self.peak_live = 0
+        self._held: dict[Hashable, int] = {}
+        self._lock = Lock()
+        self._tracing = False  # tracemalloc was started by this account
+
+    def __enter__(self) -> 'MemoryAccount':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Stops tracemalloc if the account started it."""
+        with self._lock:
+            if self._tracing:
+                self._tracing = False
+                tracemalloc.stop()
+
+    def estimate(self, task_path: str) -> int:
+        """Expected memory of running the task, 0 if it never ran."""
+        return max(self.sizes.get(task_path, 0), self.peaks.get(task_path, 0))
+
+    def fits(self, expected: int) -> bool:
+        return self.budget is None or self.live + expected <= self.budget
+
+    def hold(self, key: Hashable, task_path: str, result: Any) -> int:
+        """Accounts a result kept by a run until release; streams are not measured."""
+        size = 0 if isinstance(result, (Iterator, SharedTee)) else sizeof(result)
+        with self._lock:
+            if not isinstance(result, (Iterator, SharedTee)):
+                self.sizes[task_path] = size
+            self.live += size - self._held.get(key, 0)
+            self._held[key] = size
+            self.peak_live = max(self.peak_live, self.live)
+        return size
+
+    def release(self, key: Hashable):
+        with self._lock:
+            self.live -= self._held.pop(key, 0)
+
+    def transform(self, task_path: str, func: Callable[..., Any], *args: Any) -> Any:
+        """
+        Calls func and records its allocation peak if tracing is on. A lazy iterator result is not measured:
+        the peak only covers creating it, not the work done while it is consumed.
+        """
+        if not self.trace:
+            return func(*args)
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._tracing = True
+        tracemalloc.reset_peak()
+        start, _ = tracemalloc.get_traced_memory()
+        try:
+            return func(*args)
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            with self._lock:
+                self.peaks[task_path] = max(self.peaks.get(task_path, 0), peak - start)
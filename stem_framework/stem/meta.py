@@ -5,7 +5,9 @@ intermediate states are possible. It allows using only data or metadata.
 """
 from dataclasses import dataclass, astuple, asdict
 import dataclasses
-from typing import Optional, Any, Union, Tuple
+from functools import partial
+from types import UnionType
+from typing import Optional, Any, Union, Tuple, Iterable, get_origin, get_args, get_type_hints
 from stem.core import Dataclass
 
 
@@ -36,27 +38,127 @@ class MetaVerification:
 
     @staticmethod
     def verify(meta: Meta, specification: Optional[Specification] = None) -> "MetaVerification":
-        errors = []
-        if dataclasses.is_dataclass(specification):
-            specification = tuple((key, type(value)) for key, value in specification.__dict__.items() if key[0] != '_')
-
-        for pair in specification:
-            (required_key, required_types) = pair
-            presented_type = type(get_meta_attr(meta, required_key))
-
-            if isinstance(required_types, type):
-                required_types = (required_types, )
-
-            if isinstance(required_types, tuple):
-                if presented_type not in required_types:
-                    error = MetaFieldError(required_key, required_types, presented_type)
-                    errors.append(error)
-            else:
-                verification = MetaVerification.verify(meta, specification)
-                if verification.checked_success:
-                    errors.append(verification)
-
-        return MetaVerification(*errors)
+        if specification is None:
+            return MetaVerification()
+        return compile_specification(specification).verify(meta)
+
+    @staticmethod
+    def verify_many(metas: Iterable[Meta], specification: Optional[Specification] = None) -> list["MetaVerification"]:
+        """Verifies a batch of metas against one specification, it is compiled once for all of them."""
+        if specification is None:
+            return [MetaVerification() for _ in metas]
+        return compile_specification(specification).verify_many(metas)
+
+
+class MetaValidator:
+    """
+    A specification compiled into a flat tuple of checks: key and either the allowed types or
+    the validator of a nested specification.
+    """
+
+    def __init__(self, checks: tuple[tuple[str, Union[tuple[type, ...], "MetaValidator"]], ...]):
+        self.checks = checks
+
+    def errors(self, meta: Meta) -> list[Union[MetaFieldError, MetaVerification]]:
+        get = meta.get if isinstance(meta, dict) else partial(getattr, meta)
+        errors: list[Union[MetaFieldError, MetaVerification]] = []
+        for key, required in self.checks:
+            value = get(key, None)
+            if isinstance(required, MetaValidator):
+                nested = required.errors(value)
+                if nested:
+                    errors.append(MetaVerification(*nested))
+            elif type(value) not in required:
+                errors.append(MetaFieldError(key, required, type(value)))
+        return errors
+
+    def verify(self, meta: Meta) -> MetaVerification:
+        return MetaVerification(*self.errors(meta))
+
+    def verify_many(self, metas: Iterable[Meta]) -> list[MetaVerification]:
+        errors = self.errors
+        return [MetaVerification(*errors(meta)) for meta in metas]
+
+
+_validators: dict[Any, MetaValidator] = {}
+# unhashable specifications (dataclass instances, dicts) are cached by identity together with the object
+_validators_by_id: dict[int, tuple[Any, MetaValidator]] = {}
+_MAX_VALIDATORS = 1024
+
+
+def compile_specification(specification: Specification) -> MetaValidator:
+    """Cached validator of the specification, specifications are treated as immutable."""
+    if isinstance(specification, MetaValidator):
+        return specification
+    try:
+        validator = _validators.get(specification)
+    except TypeError:
+        entry = _validators_by_id.get(id(specification))
+        if entry is not None and entry[0] is specification:
+            return entry[1]
+        validator = _compile(specification)
+        if len(_validators_by_id) >= _MAX_VALIDATORS:
+            _validators_by_id.clear()
+        _validators_by_id[id(specification)] = (specification, validator)
+        return validator
+    if validator is None:
+        validator = _compile(specification)
+        if len(_validators) >= _MAX_VALIDATORS:
+            _validators.clear()
+        _validators[specification] = validator
+    return validator
+
+
+def _is_specification(required: Any) -> bool:
+    if dataclasses.is_dataclass(required) or isinstance(required, dict):
+        return True
+    return isinstance(required, tuple) and len(required) > 0 and \
+        all(isinstance(pair, tuple) and len(pair) == 2 and isinstance(pair[0], str) for pair in required)
+
+
+def _required_types(required: Any) -> Union[tuple[type, ...], MetaValidator]:
+    if _is_specification(required):
+        return compile_specification(required)
+    if isinstance(required, type):
+        return required,
+    if isinstance(required, tuple):
+        return required
+    origin = get_origin(required)
+    if origin is Union or origin is UnionType:
+        return tuple(t for arg in get_args(required) for t in _required_types(arg))
+    if origin is not None:
+        return origin,
+    raise SpecificationError(f"Unsupported requirement {required!r}")
+
+
+def _dataclass_fields(specification: Dataclass) -> Iterable[tuple[str, Any]]:
+    if isinstance(specification, type):
+        try:
+            hints = get_type_hints(specification)
+        except (NameError, TypeError):
+            hints = {}
+        for field in dataclasses.fields(specification):
+            if field.name[0] != '_':
+                hint = hints.get(field.name, field.type)
+                if isinstance(hint, str) and field.default is not dataclasses.MISSING:
+                    hint = type(field.default)
+                yield field.name, hint
+    else:
+        for field in dataclasses.fields(specification):
+            if field.name[0] != '_':
+                value = getattr(specification, field.name)
+                yield field.name, value if dataclasses.is_dataclass(value) else type(value)
+
+
+def _compile(specification: Specification) -> MetaValidator:
+    if dataclasses.is_dataclass(specification):
+        pairs = _dataclass_fields(specification)
+    elif isinstance(specification, dict):
+        pairs = specification.items()
+    else:
+        pairs = specification
+    return MetaValidator(tuple((key, _required_types(required)) for key, required in pairs
+                               if required is not Any and required is not object))
 
 
 def get_meta_attr(meta: Meta, key: str, default: Optional[Any] = None) -> Optional[Any]:
@@ -15,31 +15,34 @@ class Distributor:
     async def __call__(self, reader: StreamReader, writer: StreamWriter):
         logging.debug('Distributor is called')
         request = await Envelope.async_read(reader)
+        # responses use the meta format of the request
+        meta_format = request.meta_format
         if 'command' in request.meta:
             command = get_meta_attr(request.meta, 'command')
             logging.debug('Request command is ' + command)
 
             if command == 'run':
-                response = Envelope(dict(status='not implemented'))
+                response = Envelope(dict(status='not implemented'), meta_format=meta_format)
 
             elif command == 'structure':
-                response = Envelope(dict(status='not implemented'))
+                response = Envelope(dict(status='not implemented'), meta_format=meta_format)
 
             elif command == 'powerfullity':
                 logging.debug('Nothing is done: command is not implemented')
-                response = Envelope(dict(status='not implemented', powerfullity=None))
+                response = Envelope(dict(status='not implemented', powerfullity=None), meta_format=meta_format)
 
             elif command == 'stop':
                 return None
 
             else:
-                response = Envelope(dict(status='failed', error=f'Unknown command: {command}'))
+                response = Envelope(dict(status='failed', error=f'Unknown command: {command}'), meta_format=meta_format)
 
             await response.async_write_to(writer)
 
         else:
             logging.debug('Command is not found in meta')
-            await Envelope(dict(status='failed', error='Command is required')).async_write_to(writer)
+            response = Envelope(dict(status='failed', error='Command is required'), meta_format=meta_format)
+            await response.async_write_to(writer)
 
 
 async def start_distributor(host: str, port: int, servers: list[tuple[str, int]]):
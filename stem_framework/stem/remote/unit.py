@@ -19,7 +19,7 @@ class Commands:
 
 class UnitHandler(StreamRequestHandler):
     workspace: IWorkspace
-    task_tree: TaskTree = None  # TaskTree()
+    task_tree: TaskTree = TaskTree()
     task_master = TaskMaster(SimpleRunner(), task_tree)
     powerfullity: int
 
@@ -30,10 +30,12 @@ class UnitHandler(StreamRequestHandler):
         # self.rfile is a file-like object created by the handler;
         # supports the io.BufferedIOBase readable interface.
         request = Envelope.read(self.rfile)
+        # responses use the meta format of the request
+        meta_format = request.meta_format
         try:
             command = get_meta_attr(request.meta, 'command')
         except AttributeError:
-            self.wfile.write(Envelope(dict(status='failed', error=AttributeError)).to_bytes())
+            self.wfile.write(Envelope(dict(status='failed', error=AttributeError), meta_format=meta_format).to_bytes())
             return None
         logging.debug('Request command is ' + command)
         if command == 'run':
@@ -41,23 +43,25 @@ class UnitHandler(StreamRequestHandler):
                 task_path = get_meta_attr(request.meta, 'task_path')
                 task = self.workspace.find_task(task_path)
                 if task is None:
-                    response = Envelope(dict(status='failed', error='Task not found')).to_bytes()
+                    response = Envelope(dict(status='failed', error='Task not found'),
+                                        meta_format=meta_format).to_bytes()
                 else:
                     task_result = self.task_master.execute(request.meta, task, self.workspace)
-                    response = Envelope(vars(task_result)).to_bytes()
+                    response = Envelope(vars(task_result), meta_format=meta_format).to_bytes()
             else:
-                response = Envelope(dict(status='failed', error='Task not found')).to_bytes()
+                response = Envelope(dict(status='failed', error='Task not found'), meta_format=meta_format).to_bytes()
         elif command == 'structure':
-            response = Envelope(self.workspace.structure()).to_bytes()
+            response = Envelope(self.workspace.structure(), meta_format=meta_format).to_bytes()
         elif command == 'powerfullity':
-            response = Envelope(dict(status='success', powerfullity=self.powerfullity)).to_bytes()
+            response = Envelope(dict(status='success', powerfullity=self.powerfullity),
+                                meta_format=meta_format).to_bytes()
         elif command == 'stop':
             logging.debug('Stopping server')
             self.server.shutdown()
             self.server.server_close()
             return None
         else:
-            response = Envelope(dict(status='failed', error='Unknown command')).to_bytes()
+            response = Envelope(dict(status='failed', error='Unknown command'), meta_format=meta_format).to_bytes()
         self.wfile.write(response)
 
 
@@ -0,0 +1,57 @@
+"""
+Transfer of task results between processes.
+Objects are pickled with protocol 5; large out-of-band buffers (NumPy arrays, bytearrays) bypass the pipe
+and are handed over through a memory-mapped file, so the receiver maps them instead of copying.
+Iterators are materialized, the receiver gets an iterator over the stored values back.
+"""
+import os
+import mmap
+import pickle
+import tempfile
+from collections.abc import Iterator
+from typing import Any, NamedTuple, Optional
+
+SPILL_THRESHOLD = 1024*1024  # 1 Mb
+SPILL_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+
+
+class Packed(NamedTuple):
+    payload: bytes
+    is_iterator: bool = False
+    spill_path: Optional[str] = None
+    buffer_lengths: tuple[int, ...] = ()
+
+
+def pack(obj: Any, spill_threshold: int = SPILL_THRESHOLD) -> Packed:
+    is_iterator = isinstance(obj, Iterator)
+    if is_iterator:
+        obj = list(obj)
+    buffers: list[pickle.PickleBuffer] = []
+    payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    if sum(raw.nbytes for raw in raws) < spill_threshold:
+        if raws:
+            payload = pickle.dumps(obj, protocol=5)
+        return Packed(payload, is_iterator)
+    descriptor, spill_path = tempfile.mkstemp(dir=SPILL_DIR, prefix='stem-', suffix='.buf')
+    with os.fdopen(descriptor, 'wb') as file:
+        for raw in raws:
+            file.write(raw)
+    return Packed(payload, is_iterator, spill_path, tuple(raw.nbytes for raw in raws))
+
+
+def unpack(packed: Packed) -> Any:
+    if packed.spill_path is None:
+        obj = pickle.loads(packed.payload)
+    else:
+        with open(packed.spill_path, 'r+b') as file:
+            # copy-on-write mapping keeps received arrays writable without touching the file
+            mapped = mmap.mmap(file.fileno(), length=0, access=mmap.ACCESS_COPY) if any(packed.buffer_lengths) \
+                else None
+        os.unlink(packed.spill_path)
+        view, buffers, offset = memoryview(mapped if mapped is not None else b''), [], 0
+        for length in packed.buffer_lengths:
+            buffers.append(view[offset: offset + length])
+            offset += length
+        obj = pickle.loads(packed.payload, buffers=buffers)
+    return iter(obj) if packed.is_iterator else obj
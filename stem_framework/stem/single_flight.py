@@ -0,0 +1,104 @@
+"""
+Single-flight execution: concurrent runs which need the same (task, meta) instance compute it once.
+The first run to reach the instance computes it, the others wait for the same future.
+"""
+from threading import Lock
+from collections import Counter
+from concurrent.futures import Future
+from collections.abc import Iterator, Iterable
+from typing import Optional, Any, Hashable, TYPE_CHECKING
+
+from .cache import meta_fingerprint
+
+if TYPE_CHECKING:
+    from .task_runner import TaskInstance
+
+
+class Flight:
+    """Participation of one run in the computation of an instance."""
+
+    def __init__(self, flights: "SingleFlight", key: Hashable, future: Future, leader: bool):
+        self._flights = flights
+        self.key = key
+        self.future = future
+        self.leader = leader
+
+    @property
+    def done(self) -> bool:
+        return self.future.done()
+
+    def result(self) -> Any:
+        """Result computed by the leader, waits for it if needed."""
+        value, is_iterator = self.future.result()
+        return iter(value) if is_iterator else value
+
+    def publish(self, result: Any) -> Any:
+        """Hands the result to the waiting runs and returns what the leader should use instead of it."""
+        is_iterator = isinstance(result, Iterator)
+        if is_iterator:
+            result = list(result)
+        self._flights.land(self)
+        self.future.set_result((result, is_iterator))
+        return iter(result) if is_iterator else result
+
+    def fail(self, error: BaseException):
+        if not self.future.done():
+            self._flights.land(self, failed=True)
+            self.future.set_exception(error)
+
+
+class SingleFlight:
+    """
+    Instances being computed by concurrent runs, keyed by task node and meta fingerprint.
+    Results of landed flights which other runs of a batch are expected to need are kept until the last
+    of these runs releases them, so later runs reuse them as well.
+    """
+
+    def __init__(self):
+        self._flights: dict[Hashable, Future] = {}
+        self._expected: Counter = Counter()  # runs which will need the instance
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._flights)
+
+    def claim(self, instance: "TaskInstance") -> Optional[Flight]:
+        """Joins the computation of the instance, None if the meta has no fingerprint."""
+        fingerprint = meta_fingerprint(instance.meta)
+        if fingerprint is None:
+            return None
+        key = (instance.task_node, fingerprint)
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                return Flight(self, key, future, leader=False)
+            future = self._flights[key] = Future()
+            future.set_running_or_notify_cancel()
+            return Flight(self, key, future, leader=True)
+
+    def land(self, flight: Flight, failed: bool = False):
+        with self._lock:
+            if not failed and self._expected[flight.key] > 1:
+                return  # retained for the other runs
+            if self._flights.get(flight.key) is flight.future:
+                del self._flights[flight.key]
+
+    def expect(self, instances: Iterable["TaskInstance"]) -> list[Hashable]:
+        """Keys of the instances a run will need, to be passed to release when the run is over."""
+        keys = []
+        for instance in instances:
+            fingerprint = meta_fingerprint(instance.meta)
+            if fingerprint is not None:
+                keys.append((instance.task_node, fingerprint))
+        with self._lock:
+            self._expected.update(keys)
+        return keys
+
+    def release(self, keys: Iterable[Hashable]):
+        """Ends the expectations of a run, results no run expects any more are forgotten."""
+        with self._lock:
+            for key in keys:
+                self._expected[key] -= 1
+                if self._expected[key] <= 0:
+                    del self._expected[key]
+                    self._flights.pop(key, None)
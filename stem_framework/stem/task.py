@@ -3,7 +3,10 @@ This module contains tasks which are global data processing blocks.
 """
 from typing import TypeVar, Union, Tuple, Callable, Optional, Generic, Any, Iterator
 from abc import ABC, abstractmethod
-from inspect import signature
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from itertools import islice, chain
+from inspect import signature, iscoroutinefunction, isasyncgenfunction
 from functools import wraps
 from stem.core import Named
 from stem.meta import Specification, Meta
@@ -11,6 +14,11 @@ from stem.meta import Specification, Meta
 T = TypeVar("T")
 
 
+def is_async_callable(func: Callable) -> bool:
+    """True for coroutine functions and async generator functions."""
+    return iscoroutinefunction(func) or isasyncgenfunction(func)
+
+
 class Task(ABC, Generic[T], Named):
     dependencies: Tuple[Union[str, "Task"], ...]
     specification: Optional[Specification] = None
@@ -19,6 +27,11 @@ class Task(ABC, Generic[T], Named):
     def check_by_meta(self, meta: Meta):
         pass
 
+    @property
+    def is_async(self) -> bool:
+        """The transform returns a coroutine or an async generator and should run in an event loop."""
+        return is_async_callable(self.transform)
+
     @abstractmethod
     def transform(self, meta: Meta, /, **kwargs: Any) -> T:
         pass
@@ -37,6 +50,10 @@ class FunctionTask(Task[T]):
     def __call__(self, *args, **kwargs):
         return self._func(*args, **kwargs)
 
+    @property
+    def is_async(self) -> bool:
+        return is_async_callable(self._func)
+
     def transform(self, meta: Meta, /, **kwargs: Any) -> T:
         return self._func(meta, **kwargs)
 
@@ -44,6 +61,10 @@ class FunctionTask(Task[T]):
 class DataTask(Task[T]):
     dependencies = ()
 
+    @property
+    def is_async(self) -> bool:
+        return is_async_callable(self.data)
+
     @abstractmethod
     def data(self, meta: Meta) -> T:
         pass
@@ -64,6 +85,10 @@ class FunctionDataTask(DataTask[T]):
     def __call__(self, *args, **kwargs):
         return self._func(*args, **kwargs)
 
+    @property
+    def is_async(self) -> bool:
+        return is_async_callable(self._func)
+
     def data(self, meta: Meta) -> T:
         return self._func(meta)
 
@@ -101,6 +126,73 @@ class MapTask(Task[Iterator[T]]):
             yield self._func(dependence)
 
 
+def _map_chunk(func: Callable, chunk: list) -> list:
+    return [func(item) for item in chunk]
+
+
+class ParallelMapTask(MapTask[T]):
+    """
+    MapTask which applies func to chunks of the stream in a thread or process pool.
+    At most max_in_flight chunks are submitted at once, so the stream is never materialized.
+    Results keep the order of the stream if ordered, otherwise they go as soon as their chunk is done.
+    For a process pool func must be picklable, i.e. defined at module level.
+    """
+
+    def __init__(self, func: Callable, dependence: Union[str, "Task"], max_workers: Optional[int] = None,
+                 chunk_size: int = 64, max_in_flight: Optional[int] = None, ordered: bool = True,
+                 processes: bool = False, executor: Optional[Executor] = None):
+        super().__init__(func, dependence)
+        self._name = 'parallel_map_' + dependence.name
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.max_in_flight = max_in_flight
+        self.ordered = ordered
+        self.processes = processes
+        self.executor = executor
+
+    def transform(self, meta: Meta, /, **kwargs: Any) -> Iterator[T]:
+        if self.executor is not None:
+            yield from self._map(self.executor, self.dependencies.transform(meta, **kwargs))
+            return
+        executor_type = ProcessPoolExecutor if self.processes else ThreadPoolExecutor
+        with executor_type(self.max_workers) as executor:
+            yield from self._map(executor, self.dependencies.transform(meta, **kwargs))
+
+    def _map(self, executor: Executor, stream: Iterator) -> Iterator[T]:
+        stream = iter(stream)
+        max_in_flight = self.max_in_flight
+        if max_in_flight is None:
+            max_in_flight = 2 * getattr(executor, '_max_workers', 1)
+        ordered: deque[Future] = deque()
+        unordered: set[Future] = set()
+
+        def submit() -> bool:
+            chunk = list(islice(stream, self.chunk_size))
+            if chunk:
+                future = executor.submit(_map_chunk, self._func, chunk)
+                if self.ordered:
+                    ordered.append(future)
+                else:
+                    unordered.add(future)
+            return bool(chunk)
+
+        try:
+            while len(ordered) + len(unordered) < max_in_flight and submit():
+                pass
+            while ordered or unordered:
+                if self.ordered:
+                    done = [ordered.popleft()]
+                else:
+                    done, _ = wait(unordered, return_when=FIRST_COMPLETED)
+                    unordered.difference_update(done)
+                for future in done:
+                    submit()
+                    yield from future.result()
+        finally:
+            for future in chain(ordered, unordered):
+                future.cancel()
+
+
 class FilterTask(Task[Iterator[T]]):
     def __init__(self, key: Callable, dependence: Union[str, "Task"]):
         self._name = 'filter_' + dependence.name
@@ -1,13 +1,21 @@
+import os
 from enum import Enum, auto
-from typing import Optional, Callable, TypeVar, Generic
-from functools import cached_property
+from threading import Lock
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Optional, Callable, TypeVar, Generic, Any, Iterable, Iterator
 from dataclasses import dataclass, field
 
 from .meta import Meta, MetaVerification, Specification
 from .task import Task
 from .workspace import IWorkspace
-from .task_runner import TaskRunner, SimpleRunner
+from .task_runner import TaskRunner, SimpleRunner, PoolRunner, TaskInstance
 from .task_tree import TaskNode, TaskTree
+from .incremental import RunHistory
+from .cache import NOT_FOUND
+from .single_flight import SingleFlight
+from . import tracing
 
 T = TypeVar("T")
 
@@ -46,27 +54,37 @@ class TaskResult(Generic[T]):
     task_node: TaskNode[T]
     meta_errors: Optional[TaskMetaError] = None
     lazy_data: Callable[[], T] = lambda: None
+    # cached by hand: cached_property of Python 3.11 locks the whole class, so results of concurrent
+    # executions would be computed one after another
+    _data: Any = field(default=NOT_FOUND, init=False, repr=False, compare=False)
 
-    @cached_property
+    @property
     def data(self) -> Optional[T]:
-        try:
-            return self.lazy_data()
-        except Exception as e:
-            self.status = TaskStatus.INVOCATION_ERROR
-            raise e
+        if self._data is NOT_FOUND:
+            try:
+                self._data = self.lazy_data()
+            except Exception as e:
+                self.status = TaskStatus.INVOCATION_ERROR
+                raise e
+        return self._data
 
 
 class TaskMaster:
 
-    def __init__(self, task_runner: TaskRunner[T] = SimpleRunner(), task_tree: Optional[TaskTree] = None):
+    def __init__(self, task_runner: TaskRunner[T] = SimpleRunner(), task_tree: Optional[TaskTree] = None,
+                 incremental: bool = False, single_flight: bool = False):
         self.task_runner = task_runner
-        self.task_tree = task_tree
+        # the compiled graph is shared by all executions of this master
+        self.task_tree = task_tree if task_tree is not None else TaskTree()
+        # in incremental mode a run reuses outputs of the previous one where the meta slice and inputs are equal
+        self.history = RunHistory() if incremental else None
+        self._history_lock = Lock()
+        # with single flight concurrent executions compute shared (task, meta) instances once
+        self.flights = SingleFlight() if single_flight else None
 
     def execute(self, meta: Meta, task: Task[T], workspace: Optional[IWorkspace] = None) -> TaskResult[T]:
-        if self.task_tree is not None:
+        with tracing.span(task.name, 'resolve'):
             task_node = self.task_tree.resolve_node(task, workspace)
-        else:
-            task_node = TaskNode(task, workspace)
 
         if task_node.has_dependence_errors:
             return TaskResult(
@@ -74,7 +92,8 @@ class TaskMaster:
                 task_node=task_node,
             )
 
-        verification = MetaVerification.verify(meta, task.specification)
+        with tracing.span(task_node.path, 'verify'):
+            verification = MetaVerification.verify(meta, task.specification)
         if not verification.checked_success:
             meta_error = TaskMetaError(task_node=task_node, meta_error=verification)
             return TaskResult(
@@ -86,5 +105,86 @@ class TaskMaster:
         return TaskResult(
             status=TaskStatus.CONTAINS_DATA,
             task_node=task_node,
-            lazy_data=lambda: self.task_runner.run(task_node=task_node, meta=meta)
+            lazy_data=lambda: self._run(meta, task_node)
         )
+
+    def execute_many(self, metas: Iterable[Meta], task: Task[T], workspace: Optional[IWorkspace] = None,
+                     max_concurrency: Optional[int] = None) -> Iterator[tuple[int, TaskResult[T]]]:
+        """
+        Executes the task for every meta of a batch and yields (index of the meta, result) in completion order.
+        The node is resolved once and the metas are verified in bulk; results with errors go first.
+        At most max_concurrency runs go at once, instances with equal meta slices are computed once for
+        the whole batch and kept until the last run which needs them is over. The runs of a pool runner share
+        one executor, so the batch takes max_workers workers. Results are computed eagerly, data of a failed run
+        raises the error of the run.
+        """
+        metas = list(metas)
+        with tracing.span(task.name, 'resolve'):
+            task_node = self.task_tree.resolve_node(task, workspace)
+
+        if task_node.has_dependence_errors:
+            for i in range(len(metas)):
+                yield i, TaskResult(status=TaskStatus.DEPENDENCIES_ERROR, task_node=task_node)
+            return
+
+        with tracing.span(task_node.path, 'verify'):
+            verifications = MetaVerification.verify_many(metas, task.specification)
+        pending = deque()
+        for i, (meta, verification) in enumerate(zip(metas, verifications)):
+            if verification.checked_success:
+                pending.append(i)
+            else:
+                meta_error = TaskMetaError(task_node=task_node, meta_error=verification)
+                yield i, TaskResult(status=TaskStatus.META_ERROR, task_node=task_node, meta_errors=meta_error)
+
+        if max_concurrency is None:
+            max_concurrency = getattr(self.task_runner, 'max_workers', None) or os.cpu_count()
+        flights = SingleFlight()
+        # a sub-result is kept only while a pending meta needs it
+        expected = {i: flights.expect(TaskInstance.plan(metas[i], task_node, lambda meta, node: ([], NOT_FOUND)))
+                    for i in pending}
+        is_pool = isinstance(self.task_runner, PoolRunner)
+
+        def run(i: int) -> T:
+            with tracing.span(task_node.path, 'run'):
+                try:
+                    if is_pool:
+                        return self.task_runner.run(task_node=task_node, meta=metas[i], flights=flights,
+                                                    executor=workers)
+                    return self.task_runner.run(task_node=task_node, meta=metas[i], flights=flights)
+                finally:
+                    flights.release(expected.pop(i))
+
+        with self.task_runner.create_executor() if is_pool else nullcontext() as workers, \
+                ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures: dict[Future, int] = {}
+            while pending or futures:
+                while pending and len(futures) < max_concurrency:
+                    i = pending.popleft()
+                    futures[executor.submit(run, i)] = i
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield futures.pop(future), self._completed(task_node, future)
+
+    @staticmethod
+    def _completed(task_node: TaskNode[T], future: Future) -> TaskResult[T]:
+        error = future.exception()
+        if error is None:
+            result = TaskResult(status=TaskStatus.CONTAINS_DATA, task_node=task_node)
+            result._data = future.result()
+            return result
+
+        def raise_error():
+            raise error
+        return TaskResult(status=TaskStatus.INVOCATION_ERROR, task_node=task_node, lazy_data=raise_error)
+
+    def _run(self, meta: Meta, task_node: TaskNode[T]) -> T:
+        with tracing.span(task_node.path, 'run'):
+            if self.history is None:
+                return self.task_runner.run(task_node=task_node, meta=meta, flights=self.flights)
+            with self._history_lock:
+                self.history.begin()
+                result = self.task_runner.run(task_node=task_node, meta=meta, history=self.history,
+                                              flights=self.flights)
+                self.history.commit()
+                return result
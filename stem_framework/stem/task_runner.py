@@ -1,81 +1,600 @@
 import os
+import time
+import heapq
 import asyncio
+import inspect
 
-from typing import Generic, TypeVar
+from typing import Generic, TypeVar, Optional, Any, Callable
 from abc import ABC, abstractmethod
-from concurrent.futures import ThreadPoolExecutor
-from multiprocessing.pool import ThreadPool
+from contextlib import nullcontext
+from collections import Counter
+from collections.abc import Iterable, Iterator, AsyncIterator
+from itertools import count
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
 
 from .meta import Meta, get_meta_attr
+from .task import Task
 from .task_tree import TaskNode
+from .workspace import TaskReference
+from .cache import ResultCache, NOT_FOUND, meta_fingerprint
+from .artifact_store import ArtifactStore
+from .serialization import Packed, pack, unpack
+from .durations import DurationHistory, DEFAULT_PATH
+from .incremental import RunHistory
+from .single_flight import SingleFlight, Flight
+from .tee import SharedTee, BUFFER_SIZE
+from .memory import MemoryAccount
+from . import tracing
 
 T = TypeVar("T")
 
 
 class TaskRunner(ABC, Generic[T]):
+    # an iterator consumed by several dependents keeps at most this many elements in memory, the rest is spilled
+    TEE_BUFFER_SIZE = BUFFER_SIZE
+    TEE_SPILL_DIR: Optional[str] = None
+
+    def __init__(self, cache: Optional[ResultCache] = None, store: Optional[ArtifactStore] = None,
+                 memory: Optional[MemoryAccount] = None):
+        self.cache = cache
+        self.store = store
+        self.memory = memory
 
     @abstractmethod
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
+    def run(self, meta: Meta, task_node: TaskNode[T], history: Optional[RunHistory] = None,
+            flights: Optional[SingleFlight] = None) -> T:
         pass
 
+    def _lookup(self, meta: Meta, task_node: TaskNode[T]) -> tuple[list[tuple[Any, Any]], Any]:
+        """
+        Looks the node up in the cache and then in the store.
+        Returns (layer, key) pairs which missed and have to store the result, and the result or NOT_FOUND.
+        """
+        keys = []
+        for layer in (self.cache, self.store):
+            key = None if layer is None else layer.key(task_node, meta)
+            if key is None:
+                continue
+            result = layer.get(key)
+            if result is not NOT_FOUND:
+                return [], self._store(keys, result)
+            keys.append((layer, key))
+        return keys, NOT_FOUND
+
+    @staticmethod
+    def _store(keys: list[tuple[Any, Any]], result: T) -> T:
+        for layer, key in keys:
+            result = layer.put(key, result)
+        return result
+
+    @staticmethod
+    def _known_result(instance: "TaskInstance[T]", history: Optional[RunHistory]) -> Any:
+        """
+        Result of an instance found by the lookup or unchanged since the previous run, otherwise NOT_FOUND.
+        Is called once the dependencies of the instance are done.
+        """
+        if instance.result is not NOT_FOUND:
+            return instance.result if history is None else history.record(instance, instance.result, False)
+        return NOT_FOUND if history is None else history.recall(instance)
+
+    def _complete(self, instance: "TaskInstance[T]", result: T, history: Optional[RunHistory],
+                  flight: Optional[Flight] = None) -> T:
+        """Stores and records a computed result; a result of another run is only recorded."""
+        if flight is not None and not flight.leader:
+            return result if history is None else history.record(instance, result, False)
+        result = self._store(instance.keys, result)
+        result = result if history is None else history.record(instance, result)
+        return result if flight is None else flight.publish(result)
+
+    @staticmethod
+    def _claim(instance: "TaskInstance[T]", flights: Optional[SingleFlight], led: list[Flight]) -> Optional[Flight]:
+        flight = None if flights is None else flights.claim(instance)
+        if flight is not None and flight.leader:
+            led.append(flight)
+        return flight
+
+    @staticmethod
+    def _abort(led: list[Flight], error: BaseException):
+        """Fails the flights the run did not finish, so other runs do not wait for them forever."""
+        for flight in led:
+            flight.fail(error)
+
+    def _share(self, result: Any, consumers: int) -> tuple[Any, bool]:
+        """An iterator consumed by several dependents is read once through a shared tee, each of them gets a branch."""
+        if consumers > 1 and isinstance(result, Iterator):
+            return SharedTee(result, consumers, self.TEE_BUFFER_SIZE, spill_dir=self.TEE_SPILL_DIR), True
+        return result, False
+
+    def _hold(self, values: dict["TaskInstance", Any], instance: "TaskInstance[T]", value: Any):
+        values[instance] = value
+        if self.memory is not None:
+            self.memory.hold(instance, instance.task_node.path, value[0])
+
+    def _release(self, values: dict["TaskInstance", Any], remaining: Counter, instance: "TaskInstance[T]"):
+        """Drops the results of the dependencies of a finished instance which have no consumers left."""
+        for dependency in instance.dependencies:
+            remaining[dependency] -= 1
+            if remaining[dependency] == 0:
+                values.pop(dependency, None)
+                if self.memory is not None:
+                    self.memory.release(dependency)
+
+    def _release_all(self, instances: list["TaskInstance"]):
+        if self.memory is not None:
+            for instance in instances:
+                self.memory.release(instance)
+
+    @staticmethod
+    def _async_streams(instance: "TaskInstance[T]", kwargs: dict[str, Any]) -> list[str]:
+        """
+        Arguments of an async task which async generators produced: outside an event loop they were collected
+        into iterators, which are given to the task as async iterators again.
+        """
+        if not instance.task_node.task.is_async:
+            return []
+        return [dependency.task_node.task.name for dependency in instance.dependencies
+                if dependency.task_node.task.is_async and isinstance(kwargs[dependency.task_node.task.name], Iterator)]
+
+    def _call_transform(self, instance: "TaskInstance[T]", kwargs: dict[str, Any]) -> T:
+        for name in self._async_streams(instance, kwargs):
+            kwargs[name] = _replay(kwargs[name])
+        task, path = instance.task_node.task, instance.task_node.path
+        if self.memory is None:
+            return _transform(task, instance.meta, kwargs, path)
+        return self.memory.transform(path, _transform, task, instance.meta, kwargs, path)
+
+    @staticmethod
+    def _argument(value: tuple[Any, bool]) -> Any:
+        result, shared = value
+        return result.branch() if shared else result
+
+
+class TaskInstance(Generic[T]):
+    """A task node together with the meta it receives in one run."""
+
+    def __init__(self, task_node: TaskNode[T], meta: Meta):
+        self.task_node = task_node
+        self.meta = meta
+        self.dependencies: list[TaskInstance] = []
+        self.keys: list[tuple[Any, Any]] = []
+        self.result: Any = NOT_FOUND
+
+    @staticmethod
+    def plan(meta: Meta, task_node: TaskNode[T],
+             lookup: Callable[[Meta, TaskNode], tuple[list[tuple[Any, Any]], Any]]) -> list["TaskInstance"]:
+        """
+        Expands the graph of task_node for meta into instances in topological order, the root goes last.
+        Nodes reached with equal meta share one instance; instances found by lookup are not expanded.
+        """
+        instances: dict[tuple[TaskNode, Any], TaskInstance] = {}
+        order = []
+
+        def instance_of(node: TaskNode, node_meta: Meta) -> tuple[TaskInstance, bool]:
+            fingerprint = meta_fingerprint(node_meta)
+            key = (node, ('id', id(node_meta)) if fingerprint is None else fingerprint)
+            if key in instances:
+                return instances[key], False
+            instance = instances[key] = TaskInstance(node, node_meta)
+            instance.keys, instance.result = lookup(node_meta, node)
+            return instance, True
+
+        root, _ = instance_of(task_node, meta)
+        stack = [(root, iter(() if root.result is not NOT_FOUND else task_node.dependencies))]
+        while stack:
+            instance, pending = stack[-1]
+            for node in pending:
+                dependency, created = instance_of(node, get_meta_attr(instance.meta, node.task.name, {}))
+                instance.dependencies.append(dependency)
+                if created:
+                    nodes = () if dependency.result is not NOT_FOUND else node.dependencies
+                    stack.append((dependency, iter(nodes)))
+                    break
+            else:
+                stack.pop()
+                order.append(instance)
+        return order
+
 
 class SimpleRunner(TaskRunner[T]):
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        kwargs_tree = {
-            node.task.name: self.run(get_meta_attr(meta, node.task.name, {}), node)
-            for node in task_node.dependencies
-        }
-        return task_node.task.transform(meta, **kwargs_tree)
+    def run(self, meta: Meta, task_node: TaskNode[T], history: Optional[RunHistory] = None,
+            flights: Optional[SingleFlight] = None) -> T:
+        instances = TaskInstance.plan(meta, task_node, self._lookup)
+        consumers = Counter(dependency for instance in instances for dependency in instance.dependencies)
+        remaining = consumers.copy()
+        values: dict[TaskInstance, tuple[Any, bool]] = {}
+        led: list[Flight] = []
+        try:
+            for instance in instances:
+                result = self._known_result(instance, history)
+                if result is NOT_FOUND:
+                    flight = self._claim(instance, flights, led)
+                    if flight is not None and not flight.leader:
+                        result = flight.result()
+                    else:
+                        kwargs_tree = {
+                            dependency.task_node.task.name: self._argument(values[dependency])
+                            for dependency in instance.dependencies
+                        }
+                        result = self._call_transform(instance, kwargs_tree)
+                        del kwargs_tree
+                    result = self._complete(instance, result, history, flight)
+                self._hold(values, instance, self._share(result, consumers[instance]))
+                self._release(values, remaining, instance)
+        except BaseException as error:
+            self._abort(led, error)
+            raise
+        finally:
+            self._release_all(instances)
+        return self._argument(values[instances[-1]])
 
 
-class ThreadingRunner(TaskRunner[T]):
-    MAX_WORKERS = 5
+async def _collect(stream: AsyncIterator) -> list:
+    return [item async for item in stream]
+
+
+async def _replay(items: Iterable) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+def _sync_result(result: Any) -> Any:
+    """Result of an async task outside an event loop: a coroutine is run, an async generator is collected."""
+    if inspect.iscoroutine(result):
+        result = asyncio.run(result)
+    if inspect.isasyncgen(result):
+        result = iter(asyncio.run(_collect(result)))
+    return result
+
+
+def _transform(task: Task[T], meta: Meta, kwargs: dict[str, Any], path: str) -> T:
+    with tracing.span(path, 'transform'):
+        return _sync_result(task.transform(meta, **kwargs))
 
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
-            future_runs = list(executor.map(
-                self.run,
-                [get_meta_attr(meta, node.task.name, {}) for node in task_node.dependencies],
-                task_node.dependencies
-            ))
-        kwargs_tree = {
-            node.task.name: _run
-            for node, _run in zip(task_node.dependencies, future_runs)
-        }
-        return task_node.task.transform(meta, **kwargs_tree)
+
+class _SyncIterator(Iterator):
+    """Iterates an async generator of the loop from another thread."""
+
+    def __init__(self, stream: AsyncIterator, loop: asyncio.AbstractEventLoop):
+        self._stream = stream
+        self._loop = loop
+
+    def __next__(self):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            raise RuntimeError('A stream of the event loop is iterated synchronously in the loop, it would block')
+        try:
+            return asyncio.run_coroutine_threadsafe(anext(self._stream), self._loop).result()
+        except StopAsyncIteration:
+            raise StopIteration
 
 
 class AsyncRunner(TaskRunner[T]):
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        return asyncio.run(self._run(meta, task_node))
-
-    async def _run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        # Example reference:
-        # https: // docs.python.org / 3 / library / asyncio - task.html  # asyncio.TaskGroup.create_task
-        async with asyncio.TaskGroup() as tg:
-            kwargs_tasks = {
-                node.task.name: tg.create_task(self._run(get_meta_attr(meta, node.task.name, {}), node))
-                for node in task_node.dependencies
-                }
-        kwargs_tree = {name: async_task.result() for name, async_task in kwargs_tasks.items()}
-        return task_node.task.transform(meta, **kwargs_tree)
-
-
-class ProcessingRunner(TaskRunner[T]):
+    """
+    Runs every task instance as an asyncio task. Coroutine tasks are awaited in the loop, synchronous
+    transforms are offloaded to the executor (the default executor of the loop if it is None).
+    Async generators stream between tasks; a synchronous task iterates them from its executor thread.
+    """
+
+    def __init__(self, cache: Optional[ResultCache] = None, store: Optional[ArtifactStore] = None,
+                 executor: Optional[Executor] = None, memory: Optional[MemoryAccount] = None):
+        super().__init__(cache, store, memory)
+        self.executor = executor
+
+    def run(self, meta: Meta, task_node: TaskNode[T], history: Optional[RunHistory] = None,
+            flights: Optional[SingleFlight] = None) -> T:
+        return asyncio.run(self._run(meta, task_node, history, flights))
+
+    async def _run(self, meta: Meta, task_node: TaskNode[T], history: Optional[RunHistory],
+                   flights: Optional[SingleFlight]) -> T:
+        instances = TaskInstance.plan(meta, task_node, self._lookup)
+        consumers = Counter(dependency for instance in instances for dependency in instance.dependencies)
+        remaining = consumers.copy()
+        tasks: dict[TaskInstance, asyncio.Task] = {}
+        led: list[Flight] = []
+        budget = _Budget(self.memory)
+        # instances go in topological order, so tasks of dependencies exist before their dependents
+        try:
+            async with asyncio.TaskGroup() as tg:
+                for instance in instances:
+                    tasks[instance] = tg.create_task(self._execute(
+                        instance, tasks, consumers[instance], history, flights, led, remaining, budget))
+        except BaseException as error:
+            self._abort(led, error)
+            # the first failed task cancels the others, its error is the one of the run as with other runners
+            if isinstance(error, BaseExceptionGroup) and len(error.exceptions) == 1:
+                raise error.exceptions[0]
+            raise
+        finally:
+            self._release_all(instances)
+        result = self._async_argument(tasks[instances[-1]].result(), is_async=True)
+        # the loop is closed after the run, so streams which still depend on it are collected now
+        if inspect.isasyncgen(result):
+            return iter(await _collect(result))
+        if isinstance(result, Iterator) and any(instance.task_node.task.is_async for instance in instances):
+            return iter(await self._offload(list, result))
+        return result
+
+    async def _execute(self, instance: TaskInstance[T], tasks: dict[TaskInstance, asyncio.Task],
+                       consumers: int, history: Optional[RunHistory], flights: Optional[SingleFlight],
+                       led: list[Flight], remaining: Counter, budget: "_Budget") -> tuple[Any, Optional[str]]:
+        """Returns the result and how it is shared: None, 'sync' tee of an iterator or 'async' list of a stream."""
+        path = instance.task_node.path
+        with tracing.span(path, 'wait'):
+            values = await asyncio.gather(*(tasks[dependency] for dependency in instance.dependencies))
+        result = self._known_result(instance, history)
+        flight = None if result is not NOT_FOUND else self._claim(instance, flights, led)
+        if flight is not None and not flight.leader:
+            await asyncio.wrap_future(flight.future)
+            result = self._complete(instance, flight.result(), history, flight)
+        elif result is NOT_FOUND:
+            task = instance.task_node.task
+            kwargs = {
+                dependency.task_node.task.name: self._async_argument(value, task.is_async)
+                for dependency, value in zip(instance.dependencies, values)
+            }
+            if task.is_async:
+                # a sync iterator may pull a stream of this loop, so it is never iterated in the loop
+                for name, argument in kwargs.items():
+                    if isinstance(argument, Iterator):
+                        kwargs[name] = iter(await self._offload(list, argument))
+            expected = await budget.acquire(path)
+            try:
+                if task.is_async:
+                    with tracing.span(path, 'transform'):
+                        result = task.transform(instance.meta, **kwargs)
+                        if inspect.isawaitable(result):
+                            result = await result
+                else:
+                    result = await self._offload(self._call_transform, instance, kwargs)
+            finally:
+                await budget.release(expected)
+            del kwargs
+            if (instance.keys or history is not None or flight is not None) and inspect.isasyncgen(result):
+                result = iter(await _collect(result))
+            result = self._complete(instance, result, history, flight)
+        if consumers > 1 and inspect.isasyncgen(result):
+            value = await _collect(result), 'async'
+        elif consumers > 1 and isinstance(result, Iterator):
+            value = self._share(result, consumers)[0], 'sync'
+        else:
+            value = result, None
+        if self.memory is not None:
+            self.memory.hold(instance, path, value[0])
+        # tasks of dependencies keep their results, drop those which have no consumers left
+        self._release(tasks, remaining, instance)
+        return value
+
+    @staticmethod
+    def _async_argument(value: tuple[Any, Optional[str]], is_async: bool) -> Any:
+        result, shared = value
+        if shared == 'async' and is_async:
+            return _replay(result)
+        if shared == 'sync':
+            return result.branch()
+        if shared is not None:
+            return iter(result)
+        if inspect.isasyncgen(result) and not is_async:
+            return _SyncIterator(result, asyncio.get_running_loop())
+        return result
+
+    async def _offload(self, func: Callable, *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+
+class _Budget:
+    """Admission of nodes of one async run to the memory budget of the account."""
+
+    def __init__(self, memory: Optional[MemoryAccount]):
+        self.memory = memory
+        self.running = 0
+        self.expected = 0
+        self._condition: Optional[asyncio.Condition] = None
+
+    async def acquire(self, task_path: str) -> int:
+        if self.memory is None or self.memory.budget is None:
+            return 0
+        expected = self.memory.estimate(task_path)
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.running == 0 or self.memory.fits(self.expected + expected))
+            self.running += 1
+            self.expected += expected
+        return expected
+
+    async def release(self, expected: int):
+        if self._condition is None:
+            return
+        async with self._condition:
+            self.running -= 1
+            self.expected -= expected
+            self._condition.notify_all()
+
+
+class PoolRunner(TaskRunner[T]):
+    """
+    Runs the task instances of one tree in a single bounded executor.
+    An instance is submitted only when all its dependencies are done, so every instance runs exactly once
+    and no worker waits for another one. Of the ready instances the one with the longest remaining
+    critical path (estimated by durations) goes first. The durations of the transforms, from the start of their
+    execution in a worker, are recorded after every run in DURATIONS_PATH unless durations are given.
+    With a memory budget an instance waits while the held results and the expected memory of the running
+    instances would exceed it. Concurrent runs given one executor of create_executor share its workers.
+    """
     MAX_WORKERS = os.cpu_count()
+    DURATIONS_PATH: Optional[str] = DEFAULT_PATH  # None keeps the durations in memory
+
+    def __init__(self, cache: Optional[ResultCache] = None, store: Optional[ArtifactStore] = None,
+                 max_workers: Optional[int] = None, durations: Optional[DurationHistory] = None,
+                 memory: Optional[MemoryAccount] = None):
+        super().__init__(cache, store, memory)
+        self.max_workers = self.MAX_WORKERS if max_workers is None else max_workers
+        self.durations = durations if durations is not None else DurationHistory(self.DURATIONS_PATH)
+
+    @abstractmethod
+    def _executor(self) -> Executor:
+        pass
+
+    def create_executor(self) -> Executor:
+        """A new executor of max_workers workers to be passed to run and shut down by the caller."""
+        return self._executor()
+
+    @abstractmethod
+    def _submit(self, executor: Executor, instance: TaskInstance[T], kwargs: dict[str, Any]) -> Future:
+        pass
+
+    def _receive(self, instance: TaskInstance[T], result: Any) -> tuple[Any, float]:
+        """Result of a submitted future and the seconds its transform took in the worker."""
+        return result
+
+    def run(self, meta: Meta, task_node: TaskNode[T], history: Optional[RunHistory] = None,
+            flights: Optional[SingleFlight] = None, executor: Optional[Executor] = None) -> T:
+        instances = TaskInstance.plan(meta, task_node, self._lookup)
+        tracer, planned = tracing.active(), tracing.now()
+        dependents: dict[TaskInstance, list[TaskInstance]] = {instance: [] for instance in instances}
+        waiting: dict[TaskInstance, int] = {}
+        values: dict[TaskInstance, tuple[Any, bool]] = {}
+        for instance in instances:
+            for dependency in instance.dependencies:
+                dependents[dependency].append(instance)
+        remaining = Counter({instance: len(dependents[instance]) for instance in instances})
+        for instance in instances:
+            if instance.result is not NOT_FOUND:
+                self._hold(values, instance,
+                           self._share(self._known_result(instance, history), len(dependents[instance])))
+            else:
+                waiting[instance] = sum(dependency not in values for dependency in instance.dependencies)
+        ranks = self.durations.ranks(instances, lambda instance: instance.dependencies,
+                                     lambda instance: instance.task_node.path)
+        sequence = count()
+        ready = [(-ranks[instance], next(sequence), instance) for instance, n in waiting.items() if n == 0]
+        heapq.heapify(ready)
+        led: list[Flight] = []
+
+        def complete(instance: TaskInstance[T], result: Any):
+            self._hold(values, instance, self._share(result, len(dependents[instance])))
+            self._release(values, remaining, instance)
+            for dependent in dependents[instance]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, (-ranks[dependent], next(sequence), dependent))
+
+        try:
+            with self._executor() if executor is None else nullcontext(executor) as executor:
+                futures: dict[Future, tuple[TaskInstance, Optional[Flight], int]] = {}
+                # instances computed by other runs do not take workers
+                followed: dict[Future, tuple[TaskInstance, Flight]] = {}
+                expected_running = 0
+                while ready or futures or followed:
+                    deferred = []
+                    while ready and len(futures) < self.max_workers:
+                        entry = heapq.heappop(ready)
+                        instance = entry[2]
+                        result = self._known_result(instance, history)
+                        if result is not NOT_FOUND:
+                            complete(instance, result)
+                            continue
+                        expected = 0 if self.memory is None else self.memory.estimate(instance.task_node.path)
+                        if futures and self.memory is not None and not self.memory.fits(expected_running + expected):
+                            deferred.append(entry)
+                            continue
+                        flight = self._claim(instance, flights, led)
+                        if flight is not None and not flight.leader:
+                            followed[flight.future] = instance, flight
+                            continue
+                        kwargs = {
+                            dependency.task_node.task.name: self._argument(values[dependency])
+                            for dependency in instance.dependencies
+                        }
+                        if tracer is not None:
+                            tracer.add(instance.task_node.path, 'wait', planned, tracing.now())
+                        future = self._submit(executor, instance, kwargs)
+                        futures[future] = instance, flight, expected
+                        expected_running += expected
+                        del kwargs
+                    for entry in deferred:
+                        heapq.heappush(ready, entry)
+                    if not futures and not followed:
+                        continue
+                    done, _ = wait([*futures, *followed], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        if future in followed:
+                            instance, flight = followed.pop(future)
+                            complete(instance, self._complete(instance, flight.result(), history, flight))
+                            continue
+                        instance, flight, expected = futures.pop(future)
+                        expected_running -= expected
+                        result, seconds = self._receive(instance, future.result())
+                        self.durations.record(instance.task_node.path, seconds)
+                        complete(instance, self._complete(instance, result, history, flight))
+        except BaseException as error:
+            self._abort(led, error)
+            raise
+        finally:
+            self._release_all(instances)
+
+        self.durations.save()
+        return self._argument(values[instances[-1]])
+
+
+class ThreadingRunner(PoolRunner[T]):
+    MAX_WORKERS = 5
+
+    def _executor(self) -> Executor:
+        return ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def _submit(self, executor: Executor, instance: TaskInstance[T], kwargs: dict[str, Any]) -> Future:
+        return executor.submit(_timed, self._call_transform, instance, kwargs)
+
+
+def _timed(func: Callable[..., T], *args: Any) -> tuple[T, float]:
+    """Result of func and the seconds it took, measured in the worker so time in the executor queue is not counted."""
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def _transform_in_process(reference: TaskReference, meta: Meta, kwargs: dict[str, Packed],
+                          traced: bool = False, streams: tuple[str, ...] = ()) -> tuple[Packed, float, Optional[tuple]]:
+    """
+    Returns the packed result, the seconds of the transform and packing and, if traced, the span of the transform
+    to be added by the parent. Arguments named in streams are given as async iterators.
+    """
+    task = _resolved_tasks.get(reference) if reference.task is None else reference.task
+    if task is None:
+        task = _resolved_tasks[reference] = reference.resolve()
+    start, started = tracing.now(), time.perf_counter()
+    kwargs = {name: _replay(unpack(value)) if name in streams else unpack(value) for name, value in kwargs.items()}
+    result = pack(_sync_result(task.transform(meta, **kwargs)))
+    return result, time.perf_counter() - started, (start, tracing.now(), tracing.thread_id()) if traced else None
+
+
+_resolved_tasks: dict[TaskReference, Task] = {}
+
+
+class ProcessingRunner(PoolRunner[T]):
+    """
+    Runs every task instance in a pool of processes. Tasks are sent as references and resolved again
+    in the worker, results come back through serialization.pack; iterators are materialized in the worker.
+    """
+
+    def _executor(self) -> Executor:
+        return ProcessPoolExecutor(max_workers=self.max_workers)
 
-    def run(self, meta: Meta, task_node: TaskNode[T]) -> T:
-        with ThreadPool(self.MAX_WORKERS) as pool:
-            future_runs = list(pool.starmap(
-                self.run,
-                zip(
-                    [get_meta_attr(meta, node.task.name, {}) for node in task_node.dependencies],
-                    task_node.dependencies
-                )
-            ))
-        kwargs_tree = {
-            node.task.name: _run
-            for node, _run in zip(task_node.dependencies, future_runs)
-        }
-        return task_node.task.transform(meta, **kwargs_tree)
+    def _submit(self, executor: Executor, instance: TaskInstance[T], kwargs: dict[str, Any]) -> Future:
+        reference = TaskReference.of(instance.task_node.task, instance.task_node.workspace)
+        streams = tuple(self._async_streams(instance, kwargs))
+        kwargs = {name: pack(value) for name, value in kwargs.items()}
+        return executor.submit(_transform_in_process, reference, instance.meta, kwargs,
+                               tracing.active() is not None, streams)
 
+    def _receive(self, instance: TaskInstance[T], result: tuple[Packed, float, Optional[tuple]]) -> tuple[Any, float]:
+        packed, seconds, span = result
+        tracer = tracing.active()
+        if tracer is not None and span is not None:
+            start, end, thread = span
+            tracer.add(instance.task_node.path, 'transform', start, end, thread)
+        return unpack(packed), seconds
@@ -1,17 +1,40 @@
-from typing import TypeVar, Optional, Generic
+from threading import RLock
+from typing import TypeVar, Optional, Generic, Union
+from functools import cached_property
 
 from .task import Task
-from .workspace import IWorkspace
+from .workspace import IWorkspace, TaskPath
 
 T = TypeVar("T")
 
+NodeKey = tuple[IWorkspace, Task]
+
 
 class TaskNode(Generic[T]):
-    def __init__(self, task: Task, workspace: IWorkspace) -> None:
+    def __init__(self, task: Task, workspace: Optional[IWorkspace] = None,
+                 nodes: Optional[dict[NodeKey, "TaskNode"]] = None) -> None:
         self.task = task
         self._workspace = IWorkspace.find_default_workspace(task) if workspace is None else workspace
-        self._dependencies = TaskNode.set_resolved(task, self._workspace)
-        self._unresolved_dependencies = TaskNode.set_unresolved(task, self._workspace)
+        self._dependencies: list[TaskNode] = []
+        self._unresolved_dependencies: list[str] = []
+        if nodes is None:
+            TaskNode.compile(self, {})
+
+    @property
+    def key(self) -> NodeKey:
+        return self._workspace, self.task
+
+    @property
+    def path(self) -> str:
+        return f"{self._workspace.name}.{self.task.name}"
+
+    @property
+    def qualified_path(self) -> str:
+        """Path prefixed by the full name of the defining module: workspace names are only module leaf names."""
+        module_name = self._workspace.module_name
+        if module_name is None:
+            module_name = getattr(getattr(self.task, '_func', None), '__module__', None) or type(self.task).__module__
+        return f"{module_name}:{self.path}"
 
     @property
     def dependencies(self) -> list["TaskNode"]:
@@ -33,45 +56,106 @@ class TaskNode(Generic[T]):
     def has_dependence_errors(self) -> bool:
         return len(self.unresolved_dependencies) != 0
 
+    @cached_property
+    def topological_order(self) -> list["TaskNode"]:
+        """Nodes of the subgraph rooted here, every dependency goes before its dependents."""
+        order, visited = [], {id(self)}
+        stack = [(self, iter(self._dependencies))]
+        while stack:
+            node, pending = stack[-1]
+            for child in pending:
+                if id(child) not in visited:
+                    visited.add(id(child))
+                    stack.append((child, iter(child.dependencies)))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+        return order
+
     @staticmethod
-    def set_resolved(task: Task[T], workspace: IWorkspace) -> list["TaskNode"]:
-        _resolved = []
-        for taskpath in task.dependencies:
-            if workspace.has_task(taskpath):
-                _resolved.append(TaskNode(workspace.find_task(taskpath), workspace))
-        return _resolved
+    def resolve_dependency(taskpath: Union[str, TaskPath, Task], workspace: IWorkspace) -> Optional[Task]:
+        if isinstance(taskpath, Task):
+            return taskpath
+        return workspace.find_task(taskpath)
 
     @staticmethod
-    def set_unresolved(task: Task[T], workspace: IWorkspace) -> list["str"]:
-        _unresolved_dependencies = []
-        for taskpath in task.dependencies:
-            if not workspace.has_task(taskpath):
-                _unresolved_dependencies.append(task.name)
-            elif workspace.has_task(taskpath) and len(task.dependencies) != 0:
-                task = workspace.find_task(taskpath)
-                _unresolved_dependencies.extend(TaskNode.set_unresolved(task, workspace))
-        return _unresolved_dependencies
+    def compile(root: "TaskNode", nodes: dict[NodeKey, "TaskNode"]) -> list["TaskNode"]:
+        """
+        Links every node reachable from root, creating one node per (workspace, task) pair.
+        Nodes already present in nodes are reused as is. Returns the new nodes in topological order.
+        """
+        nodes[root.key] = root
+        order, active = [], {root.key}
+        stack = [(root, iter(root.task.dependencies))]
+        while stack:
+            node, pending = stack[-1]
+            for taskpath in pending:
+                dependency = TaskNode.resolve_dependency(taskpath, node.workspace)
+                key = (node.workspace, dependency)
+                if dependency is None or key in active:
+                    node._unresolved_dependencies.append(str(taskpath))
+                    continue
+                child = nodes.get(key)
+                if child is None:
+                    child = nodes[key] = TaskNode(dependency, node.workspace, nodes)
+                    node._dependencies.append(child)
+                    active.add(key)
+                    stack.append((child, iter(dependency.dependencies)))
+                    break
+                node._dependencies.append(child)
+            else:
+                stack.pop()
+                active.discard(node.key)
+                unresolved = dict.fromkeys(node._unresolved_dependencies)
+                for child in node._dependencies:
+                    unresolved.update(dict.fromkeys(child.unresolved_dependencies))
+                node._unresolved_dependencies = list(unresolved)
+                order.append(node)
+        return order
 
 
 class TaskTree:
-    def __init__(self, task: Task[T], workspace: Optional[IWorkspace] = None) -> None:
-        self.root = TaskTree.build_node(task, workspace)
+    def __init__(self, task: Optional[Task[T]] = None, workspace: Optional[IWorkspace] = None) -> None:
+        self._nodes: dict[NodeKey, TaskNode] = {}
+        self._order: list[TaskNode] = []
+        self._default_workspaces: dict[Task, IWorkspace] = {}
+        self._module_workspaces: dict[str, IWorkspace] = {}
+        # executions may resolve concurrently, every node must be compiled once
+        self._lock = RLock()
+        self.root = self.resolve_node(task, workspace) if task is not None else None
+
+    @property
+    def order(self) -> list[TaskNode]:
+        """All compiled nodes in topological order."""
+        return self._order
+
+    def __len__(self) -> int:
+        return len(self._nodes)
 
     @staticmethod
     def build_node(task: Task[T], workspace: Optional[IWorkspace] = None) -> TaskNode[T]:
         return TaskNode(task, workspace)
 
-    def find_task(self, task: Task[T],  workspace: Optional[IWorkspace] = None) -> TaskNode[T]:
-        if task == self.root.task and workspace == self.root.workspace:
-            return self.root
-        else:
-            for dependency in self.root.dependencies:
-                subtree = TaskTree(dependency.task, dependency.workspace)
-                node = subtree.find_task(task, workspace)
-                if node is not None:
-                    return node
+    def default_workspace(self, task: Task[T]) -> IWorkspace:
+        # module workspaces are rebuilt when names are added to the module, so keep the first one of every module
+        # to make keys stable and to share nodes between tasks of the module
+        if task not in self._default_workspaces:
+            workspace = IWorkspace.find_default_workspace(task)
+            if workspace is not None and not hasattr(task, '_stem_workspace'):
+                workspace = self._module_workspaces.setdefault(workspace.module_name, workspace)
+            self._default_workspaces[task] = workspace
+        return self._default_workspaces[task]
+
+    def find_task(self, task: Task[T],  workspace: Optional[IWorkspace] = None) -> Optional[TaskNode[T]]:
+        workspace = self.default_workspace(task) if workspace is None else workspace
+        return self._nodes.get((workspace, task))
 
     def resolve_node(self, task: Task[T], workspace: Optional[IWorkspace] = None) -> TaskNode[T]:
-        workspace = IWorkspace.find_default_workspace(task) if workspace is None else workspace
-        node = self.find_task(task, workspace)
-        return node
+        with self._lock:
+            workspace = self.default_workspace(task) if workspace is None else workspace
+            node = self.find_task(task, workspace)
+            if node is None:
+                node = TaskNode(task, workspace, self._nodes)
+                self._order.extend(TaskNode.compile(node, self._nodes))
+            return node
@@ -0,0 +1,163 @@
+"""
+Shared tee of an iterator consumed by several dependents.
+The source is read once; elements are buffered between the slowest and the fastest consumer.
+The buffer holds at most buffer_size elements in memory: older elements are spilled to a temporary file
+in blocks, or, with spilling off, the fastest consumer waits until the others catch up.
+"""
+import pickle
+import tempfile
+from bisect import bisect_right
+from collections import deque
+from collections.abc import Iterator
+from threading import Condition
+from typing import Iterable, Optional, Any, BinaryIO
+
+BUFFER_SIZE = 1024
+
+
+class SharedTee:
+
+    def __init__(self, source: Iterable, consumers: int, buffer_size: int = BUFFER_SIZE, spill: bool = True,
+                 spill_dir: Optional[str] = None):
+        self.buffer_size = max(buffer_size, 1)
+        self.spill = spill
+        self.spill_dir = spill_dir
+        self._source = iter(source)
+        self._buffer: deque = deque()
+        self._start = 0  # index of the first element kept in memory
+        self._positions: list[Optional[int]] = [0] * consumers  # None for released branches
+        self._issued = 0
+        self._exhausted = False
+        self._error: Optional[BaseException] = None
+        # blocks of spilled elements: first index, offset and length in the file
+        self._blocks: list[tuple[int, int, int]] = []
+        self._file: Optional[BinaryIO] = None
+        self._unpicklable = False
+        self.spilled = 0  # number of elements written to the spill file
+        self._read_blocks: dict[int, tuple[int, list]] = {}
+        self._condition = Condition()
+
+    @property
+    def buffered(self) -> int:
+        """Number of elements kept in memory."""
+        return len(self._buffer)
+
+    def branch(self) -> "TeeBranch":
+        """Iterator for the next consumer, the tee has exactly as many of them as consumers."""
+        with self._condition:
+            if self._issued == len(self._positions):
+                raise ValueError("All branches of the tee are already taken")
+            self._issued += 1
+            return TeeBranch(self, self._issued - 1)
+
+    def _next(self, consumer: int) -> Any:
+        with self._condition:
+            position = self._positions[consumer]
+            while position == self._start + len(self._buffer) and not self._exhausted:
+                if len(self._buffer) >= self.buffer_size and not self._make_room():
+                    self._condition.wait()
+                    continue
+                try:
+                    self._buffer.append(next(self._source))
+                except StopIteration:
+                    self._exhausted = True
+                    self._condition.notify_all()
+                except BaseException as error:
+                    self._exhausted, self._error = True, error
+                    self._condition.notify_all()
+            if position == self._start + len(self._buffer):
+                if self._error is not None:
+                    raise self._error
+                raise StopIteration
+            value = self._buffer[position - self._start] if position >= self._start else self._read(consumer, position)
+            self._positions[consumer] = position + 1
+            self._trim()
+            return value
+
+    def _make_room(self) -> bool:
+        """Spills the older half of the buffer, False if the consumer has to wait instead."""
+        if self._unpicklable:
+            return True
+        if not self.spill:
+            return False
+        count = max(len(self._buffer) // 2, 1)
+        elements = [self._buffer[i] for i in range(count)]
+        try:
+            dump = pickle.dumps(elements, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # such elements can only stay in memory
+            self._unpicklable = True
+            return True
+        if self._file is None:
+            self._file = tempfile.TemporaryFile(dir=self.spill_dir, prefix='stem-tee-')
+        offset = self._file.seek(0, 2)
+        self._file.write(dump)
+        self._blocks.append((self._start, offset, len(dump)))
+        for _ in range(count):
+            self._buffer.popleft()
+        self._start += count
+        self.spilled += count
+        return True
+
+    def _read(self, consumer: int, position: int) -> Any:
+        first, elements = self._read_blocks.get(consumer, (0, []))
+        if not first <= position < first + len(elements):
+            i = bisect_right(self._blocks, position, key=lambda block: block[0]) - 1
+            first, offset, length = self._blocks[i]
+            self._file.seek(offset)
+            elements = pickle.loads(self._file.read(length))
+            self._read_blocks[consumer] = first, elements
+        return elements[position - first]
+
+    def _trim(self):
+        positions = [position for position in self._positions if position is not None]
+        low = min(positions) if positions else self._start + len(self._buffer)
+        dropped = False
+        while self._buffer and self._start < low:
+            self._buffer.popleft()
+            self._start += 1
+            dropped = True
+        if dropped:
+            self._condition.notify_all()
+        if not positions:
+            self._close()
+
+    def _release(self, consumer: int):
+        with self._condition:
+            self._positions[consumer] = None
+            self._read_blocks.pop(consumer, None)
+            self._trim()
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._blocks.clear()
+
+
+class TeeBranch(Iterator):
+    """Iterator of one consumer of a shared tee; releases its place in the buffer when exhausted or closed."""
+
+    def __init__(self, tee: SharedTee, consumer: int):
+        self._tee: Optional[SharedTee] = tee
+        self._consumer = consumer
+
+    def __iter__(self) -> "TeeBranch":
+        return self
+
+    def __next__(self) -> Any:
+        if self._tee is None:
+            raise StopIteration
+        try:
+            return self._tee._next(self._consumer)
+        except StopIteration:
+            self.close()
+            raise
+
+    def close(self):
+        tee, self._tee = self._tee, None
+        if tee is not None:
+            tee._release(self._consumer)
+
+    def __del__(self):
+        self.close()
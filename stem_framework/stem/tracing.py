@@ -0,0 +1,84 @@
+"""
+Execution tracing in the Chrome trace / Perfetto JSON format.
+Spans are recorded only while a tracer is active, otherwise span() returns a shared no-op context.
+
+    with Tracer() as tracer:
+        task_master.execute(meta, task).data
+    tracer.export('trace.json')
+"""
+import os
+import json
+import time
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Optional, Any, ContextManager, Iterator
+
+_NULL_SPAN = nullcontext()
+_active: Optional["Tracer"] = None
+
+
+def now() -> float:
+    """Timestamp in microseconds, comparable between processes of the host."""
+    return time.perf_counter_ns() / 1000
+
+
+def thread_id() -> tuple[int, int, str]:
+    thread = threading.current_thread()
+    return os.getpid(), threading.get_native_id(), thread.name
+
+
+class Tracer:
+
+    def __init__(self):
+        self.events: list[dict[str, Any]] = []
+        self._threads: dict[tuple[int, int], str] = {}
+        self._lock = threading.Lock()
+        self._previous: Optional[Tracer] = None
+
+    def __enter__(self) -> "Tracer":
+        global _active
+        self._previous, _active = _active, self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _active
+        _active = self._previous
+
+    def add(self, name: str, category: str, start: float, end: float,
+            thread: Optional[tuple[int, int, str]] = None, **args: Any):
+        pid, tid, thread_name = thread_id() if thread is None else thread
+        event = dict(name=name, cat=category, ph='X', ts=start, dur=end - start, pid=pid, tid=tid)
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+            self._threads[(pid, tid)] = thread_name
+
+    @contextmanager
+    def span(self, name: str, category: str, **args: Any) -> Iterator[None]:
+        start = now()
+        try:
+            yield
+        finally:
+            self.add(name, category, start, now(), **args)
+
+    def to_chrome_trace(self) -> dict[str, Any]:
+        with self._lock:
+            names = [
+                dict(name='thread_name', ph='M', pid=pid, tid=tid, args=dict(name=name))
+                for (pid, tid), name in self._threads.items()
+            ]
+            return dict(traceEvents=names + list(self.events), displayTimeUnit='ms')
+
+    def export(self, path: str):
+        with open(path, 'w') as file:
+            json.dump(self.to_chrome_trace(), file)
+
+
+def active() -> Optional[Tracer]:
+    return _active
+
+
+def span(name: str, category: str, **args: Any) -> ContextManager:
+    tracer = _active
+    return _NULL_SPAN if tracer is None else tracer.span(name, category, **args)
@@ -2,7 +2,9 @@
 Modularity concept means that the core of the system contains only basic functionality for working, and
 all specific functions, such as the graphical environment or tools, are placed in separate plug-ins.
 """
+import sys
 from abc import abstractmethod, ABC, ABCMeta
+from importlib import import_module
 from types import ModuleType
 from typing import Optional, Any, TypeVar, Union
 from inspect import isclass, getmodule
@@ -12,6 +14,17 @@ from stem.task import Task
 
 T = TypeVar("T")
 
+# indexes of workspaces built before the latest invalidate_workspaces() are rebuilt on the next lookup
+_generation = 0
+_module_workspaces: dict[str, tuple[ModuleType, int, "IWorkspace"]] = {}
+
+
+def invalidate_workspaces():
+    """Drops the task indexes of all workspaces and the cached module workspaces, e.g. after reloading modules."""
+    global _generation
+    _generation += 1
+    _module_workspaces.clear()
+
 
 class TaskPath:
     def __init__(self, path: Union[str, list[str]]):
@@ -54,6 +67,10 @@ class ProxyTask(Task[T]):
     def specification(self):
         return self._task.specification
 
+    @property
+    def is_async(self) -> bool:
+        return self._task.is_async
+
     def check_by_meta(self, meta: Meta):
         self._task.check_by_meta(meta)
 
@@ -64,6 +81,13 @@ class ProxyTask(Task[T]):
 class IWorkspace(ABC, Named):
     _tasks: dict[str, Task] = NotImplemented
     _workspaces: set['IWorkspace'] = NotImplemented
+    _module_name: Optional[str] = None
+    _task_index: Optional[tuple[int, dict[str, Task], dict[str, "IWorkspace"]]] = None
+
+    @property
+    def module_name(self) -> Optional[str]:
+        """Name of the module which defines the workspace, if it can be imported again."""
+        return self._module_name
 
     @property
     @abstractmethod
@@ -75,27 +99,49 @@ class IWorkspace(ABC, Named):
     def workspaces(self) -> set["IWorkspace"]:
         pass
 
+    def _index(self) -> tuple[dict[str, Task], dict[str, "IWorkspace"]]:
+        """
+        Flat index of the workspace: every task by its leaf name and by its path through sub-workspaces,
+        and the sub-workspaces by name. Own tasks shadow tasks of sub-workspaces with the same leaf name.
+        """
+        index = self._task_index
+        if index is not None and index[0] == _generation:
+            return index[1], index[2]
+        tasks = dict(self.tasks)
+        workspaces = {}
+        for workspace in self.workspaces:
+            workspaces.setdefault(workspace.name, workspace)
+            sub_tasks, _ = workspace._index()
+            for path, task in sub_tasks.items():
+                if '.' not in path:
+                    tasks.setdefault(path, task)
+                tasks.setdefault(f"{workspace.name}.{path}", task)
+        self._task_index = (_generation, tasks, workspaces)
+        return tasks, workspaces
+
+    @property
+    def task_paths(self) -> list[str]:
+        """Every path find_task resolves."""
+        return list(self._index()[0])
+
+    def invalidate(self):
+        """
+        To be called after tasks or sub-workspaces of the workspace are changed: drops its index and the indexes
+        of the workspaces which include it, and the cached workspace of its module, which is scanned again.
+        """
+        global _generation
+        _generation += 1
+        if self.module_name is not None:
+            _module_workspaces.pop(self.module_name, None)
+
     def find_task(self, task_path: Union[str, TaskPath]) -> Optional[Task]:
-        if isinstance(task_path, str):
-            task_path = TaskPath(task_path)
-        if task_path.is_leaf:
-            task = self.tasks.get(task_path.name, None)
-            if task is None:
-                for w in self.workspaces:
-                    task = w.find_task(task_path)
-            return task
-        else:
-            workspace = self.get_workspace(task_path.head)
-            return workspace.find_task(task_path.sub_path)
+        return self._index()[0].get(str(task_path))
 
     def has_task(self, task_path: Union[str, TaskPath]) -> bool:
         return self.find_task(task_path) is not None
 
     def get_workspace(self, name) -> Optional["IWorkspace"]:
-        for workspace in self.workspaces:
-            if workspace.name == name:
-                return workspace
-        return None
+        return self._index()[1].get(name)
 
     def structure(self) -> dict:
         return {
@@ -115,6 +161,18 @@ class IWorkspace(ABC, Named):
 
     @staticmethod
     def module_workspace(module: ModuleType) -> "IWorkspace":
+        # the cached workspace is valid while the module is the same, no names were added to it and its tasks
+        # are still bound to their names; a name rebound to a task needs invalidate()
+        cached = _module_workspaces.get(module.__name__)
+        if cached is not None and cached[0] is module and cached[1] == len(module.__dict__) and \
+                all(module.__dict__.get(name) is task for name, task in cached[2].tasks.items()):
+            return cached[2]
+        workspace = IWorkspace._scan_module(module)
+        _module_workspaces[module.__name__] = (module, len(module.__dict__), workspace)
+        return workspace
+
+    @staticmethod
+    def _scan_module(module: ModuleType) -> "IWorkspace":
         filename = module.__name__.split('.').pop()
         tasks = {}
         workspaces = set()
@@ -125,7 +183,7 @@ class IWorkspace(ABC, Named):
             elif isclass(t) and t == IWorkspace:
                 workspaces.add(t)
 
-        return LocalWorkspace(filename, tasks, workspaces)
+        return LocalWorkspace(filename, tasks, workspaces, module.__name__)
 
 
 class ILocalWorkspace(IWorkspace):
@@ -139,10 +197,11 @@ class ILocalWorkspace(IWorkspace):
 
 
 class LocalWorkspace(ILocalWorkspace):
-    def __init__(self, name, tasks=(), workspaces=()):
+    def __init__(self, name, tasks=(), workspaces=(), module_name=None):
         self._name = name
         self._tasks = tasks
         self._workspaces = workspaces
+        self._module_name = module_name
 
 
 class Workspace(ABCMeta, ILocalWorkspace):
@@ -161,6 +220,7 @@ class Workspace(ABCMeta, ILocalWorkspace):
         cls_inst._name = name
         cls_inst._tasks = _tasks
         cls_inst._workspaces = set(_workspaces)
+        cls_inst._module_name = namespace.get('__module__')
 
         for n, t in cls.__dict__.items():
             if isinstance(t, Task):
@@ -169,3 +229,62 @@ class Workspace(ABCMeta, ILocalWorkspace):
 
         return cls_inst
 
+
+def _unwrap(task: Task) -> Task:
+    return task._task if isinstance(task, ProxyTask) else task
+
+
+class TaskReference:
+    """
+    Picklable reference to a task of a workspace: the module defining the workspace, the workspace name and
+    the task path. It is resolved again by importing the module, so task functions are never pickled.
+    A task of a workspace without a module is referenced as the global of its defining module which
+    @task and @data bind to it (the workspace name is None then); other tasks are carried by value.
+    """
+
+    def __init__(self, module_name: Optional[str], workspace_name: Optional[str], task_path: str,
+                 task: Optional[Task] = None):
+        self.module_name = module_name
+        self.workspace_name = workspace_name
+        self.task_path = task_path
+        self.task = task
+
+    @staticmethod
+    def of(task: Task, workspace: IWorkspace) -> "TaskReference":
+        module_name = workspace.module_name
+        if module_name is not None:
+            found = workspace.find_task(task.name)
+            if found is not None and _unwrap(found) is _unwrap(task):
+                return TaskReference(module_name, workspace.name, task.name)
+        task = _unwrap(task)
+        func = getattr(task, '_func', None)
+        module_name = getattr(func, '__module__', None) or type(task).__module__
+        module = sys.modules.get(module_name)
+        if module is not None and getattr(module, task.name, None) is task:
+            return TaskReference(module_name, None, task.name)
+        return TaskReference(None, None, task.name, task)
+
+    def resolve_workspace(self) -> IWorkspace:
+        module = import_module(self.module_name)
+        if self.workspace_name == module.__name__.split('.').pop():
+            return IWorkspace.module_workspace(module)
+        return getattr(module, self.workspace_name)
+
+    def resolve(self) -> Task:
+        if self.task is not None:
+            return self.task
+        if self.workspace_name is None:
+            return getattr(import_module(self.module_name), self.task_path)
+        task = self.resolve_workspace().find_task(self.task_path)
+        if task is None:
+            raise LookupError(f'Task {self} is not found')
+        return task
+
+    def __str__(self):
+        return f"{self.module_name}:{self.workspace_name}.{self.task_path}"
+
+    def __eq__(self, other):
+        return isinstance(other, TaskReference) and str(self) == str(other) and self.task is other.task
+
+    def __hash__(self):
+        return hash(str(self))
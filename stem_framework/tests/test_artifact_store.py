@@ -0,0 +1,89 @@
+import os
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from stem.artifact_store import ArtifactStore, code_fingerprint
+from stem.cache import NOT_FOUND
+from stem.task import data
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner
+from stem.task_tree import TaskTree
+from tests.example_task import IntRange, int_range, int_scale, float_range
+
+calls = []
+
+
+@data
+def array_source(meta):
+    calls.append("array_source")
+    return np.arange(meta.get("stop", 10), dtype="float32")
+
+
+class ArtifactStoreTest(TestCase):
+
+    def setUp(self) -> None:
+        calls.clear()
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ArtifactStore(self.directory.name)
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_code_fingerprint(self):
+        self.assertEqual(code_fingerprint(int_range), code_fingerprint(int_range))
+        self.assertNotEqual(code_fingerprint(int_range), code_fingerprint(float_range))
+        self.assertEqual(code_fingerprint(IntRange()), code_fingerprint(IntRange()))
+
+    def test_key(self):
+        node = TaskTree(int_scale).root
+        self.assertEqual(self.store.key(node, {}), self.store.key(node, {}))
+        self.assertNotEqual(self.store.key(node, {}), self.store.key(node, dict(int_range=dict(stop=5))))
+        self.assertNotEqual(self.store.key(node, {}), self.store.key(node.dependencies[0], {}))
+
+    def test_put_get(self):
+        self.assertIs(NOT_FOUND, self.store.get("00ff"))
+        self.assertListEqual([0, 1, 2], list(self.store.put("00aa", iter(range(3)))))
+        self.assertListEqual([0, 1, 2], list(self.store.get("00aa")))
+        self.store.put("00bb", b"0123")
+        self.assertEqual(b"0123", bytes(self.store.get("00bb")))
+        array = np.arange(12, dtype="int16").reshape(3, 4)
+        self.store.put("00cc", array)
+        np.testing.assert_array_equal(array, self.store.get("00cc"))
+        self.assertEqual((2, 1), (self.store.hits - 1, self.store.misses))
+
+    def test_same_type_on_hit(self):
+        self.assertEqual(b"0123!", self.store.put("00dd", b"0123") + b"!")
+        self.assertEqual(b"0123!", self.store.get("00dd") + b"!")
+        for array in [self.store.put("00ee", np.arange(4, dtype="int16")), self.store.get("00ee")]:
+            array += 1
+            np.testing.assert_array_equal(np.arange(1, 5), array)
+        store = ArtifactStore(self.directory.name, zero_copy=True)
+        self.assertIsInstance(store.put("00ef", b"0123"), memoryview)
+        self.assertIsInstance(store.get("00ef"), memoryview)
+        array = store.put("00ff", np.arange(4, dtype="int16"))
+        self.assertFalse(array.flags.writeable)
+        self.assertFalse(store.get("00ff").flags.writeable)
+
+    def test_gc(self):
+        for i in range(4):
+            self.store.put(f"{i:04x}", b"0" * 1000)
+        self.assertEqual(2, self.store.gc(max_bytes=2100))
+        self.assertNotIn("0000", self.store)
+        self.assertIn("0003", self.store)
+
+    def test_overwrite(self):
+        for _ in range(3):
+            self.store.put("0000", b"0" * 1000)
+        # the replaced artifact is not counted twice
+        self.assertEqual(ArtifactStore(self.directory.name)._size, self.store._size)
+
+    def test_persistence(self):
+        for _ in range(2):
+            runner = SimpleRunner(store=ArtifactStore(self.directory.name))
+            result = TaskMaster(runner).execute({}, array_source)
+            np.testing.assert_array_equal(np.arange(10, dtype="float32"), result.data)
+        self.assertEqual(1, len(calls))
+        self.assertFalse([name for _, _, names in os.walk(self.directory.name)
+                          for name in names if name.endswith(".tmp")])
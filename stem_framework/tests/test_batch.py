@@ -0,0 +1,53 @@
+from functools import reduce
+from unittest import TestCase
+
+import numpy as np
+
+from stem.batch import chunked, unchunked, ChunkTask, BatchMapTask, BatchFilterTask, BatchReduceTask
+from tests.example_task import int_range, float_range
+
+
+class BatchTest(TestCase):
+
+    def test_chunked(self):
+        chunks = list(chunked(range(10), chunk_size=4))
+        self.assertListEqual([4, 4, 2], [len(chunk) for chunk in chunks])
+        self.assertListEqual(list(range(10)), list(unchunked(chunks)))
+        self.assertIs(chunks[0], next(chunked(iter(chunks))))
+        self.assertListEqual([], list(chunked([])))
+
+    def test_chunked_mixed(self):
+        chunk, = chunked([1, 2.5, 3.7])
+        np.testing.assert_array_equal(np.array([1, 2.5, 3.7]), chunk)
+        chunks = list(chunked([1, 2, 3.5], chunk_size=2))
+        self.assertEqual(np.float64, chunks[1].dtype)
+
+    def test_chunked_dtype(self):
+        chunk = next(chunked(float_range.data({})))
+        self.assertEqual(np.float32, chunk.dtype)
+
+    def test_chunk_task(self):
+        task = ChunkTask(int_range, chunk_size=3)
+        self.assertEqual(task.name, "chunk_int_range")
+        self.assertListEqual([3, 3, 3, 1], [len(chunk) for chunk in task.transform({})])
+
+    def test_batch_map_task(self):
+        task = BatchMapTask(lambda x: x * 10, int_range, chunk_size=4)
+        self.assertEqual(task.name, "batch_map_int_range")
+        self.assertListEqual(list(range(0, 100, 10)), list(unchunked(task.transform({}))))
+
+    def test_batch_filter_task(self):
+        task = BatchFilterTask(lambda x: x % 2 == 0, int_range, chunk_size=4)
+        self.assertEqual(task.name, "batch_filter_int_range")
+        self.assertListEqual(list(range(0, 10, 2)), list(unchunked(task.transform({}))))
+
+    def test_batch_reduce_task(self):
+        task = BatchReduceTask(np.add, int_range, chunk_size=4)
+        self.assertEqual(task.name, "batch_reduce_int_range")
+        self.assertEqual(reduce(lambda acc, x: acc + x, range(0, 10, 1)), task.transform({}))
+        self.assertEqual(9, BatchReduceTask(np.maximum, int_range, chunk_size=3).transform({}))
+
+    def test_batch_reduce_empty(self):
+        task = BatchReduceTask(np.add, BatchFilterTask(lambda x: x > 100, int_range))
+        with self.assertRaisesRegex(TypeError, "empty stream"):
+            task.transform({})
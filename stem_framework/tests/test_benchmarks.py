@@ -0,0 +1,40 @@
+import contextlib
+import io
+from unittest import TestCase
+
+from benchmarks import bench_runners, bench_meta
+from benchmarks.__main__ import main
+from benchmarks.common import Results, measure, compare
+from stem.task_master import TaskMaster
+from stem.workspace import LocalWorkspace
+
+
+class BenchmarksTest(TestCase):
+
+    def test_shapes(self):
+        expected = dict(wide=sum(range(8)), deep=7, diamond=4 ** 2, pipeline=sum(range(16, 24)))
+        for shape, value in expected.items():
+            task = bench_runners.SHAPES[shape](8)
+            workspace = LocalWorkspace('bench', {task.name: task})
+            for name, runner in bench_runners.RUNNERS.items():
+                with self.subTest(shape=shape, runner=name):
+                    self.assertEqual(TaskMaster(runner()).execute({}, task, workspace).data, value)
+
+    def test_compare(self):
+        old, new = Results(), Results()
+        old.add('suite', 'case', dict(n=1), measure(lambda: None, repeat=2))
+        new.add('suite', 'case', dict(n=1), dict(min=1.0, median=1.0, mean=1.0))
+        new.add('suite', 'case', dict(n=2), dict(min=1.0, median=1.0, mean=1.0))
+        lines = compare(old.to_json(), new.to_json())
+        self.assertEqual(len(lines), 1)
+        self.assertIn('suite.case n=1', lines[0])
+
+    def test_meta_suite(self):
+        results = Results()
+        bench_meta.run(results, quick=True)
+        self.assertEqual({case['params']['format'] for case in results.cases}, {'json', 'binary'})
+
+    def test_unknown_suite(self):
+        with contextlib.redirect_stderr(io.StringIO()) as error, self.assertRaises(SystemExit):
+            main(['meta', 'nonsense'])
+        self.assertIn('unknown suites: nonsense', error.getvalue())
@@ -0,0 +1,119 @@
+from unittest import TestCase
+
+from stem.cache import ResultCache, meta_fingerprint
+from stem.task import data, task
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner
+from stem.workspace import LocalWorkspace
+from tests.example_task import int_scale
+
+calls = []
+
+
+@data
+def counted_range(meta):
+    calls.append("counted_range")
+    return range(meta.get("stop", 10))
+
+
+def uncached_scale(meta):
+    return 10
+
+
+uncached_scale = data(uncached_scale, cache=False)
+
+
+@task
+def counted_scale(meta, counted_range, uncached_scale):
+    calls.append("counted_scale")
+    return map(lambda x: uncached_scale * x, counted_range)
+
+
+workspace = LocalWorkspace("cached", dict(counted_range=counted_range, uncached_scale=uncached_scale,
+                                          counted_scale=counted_scale))
+
+
+def _named_load(value):
+    def load(meta):
+        return value
+    return data(load)
+
+
+# module workspaces of a.tasks and b.tasks are both named tasks
+same_named = [LocalWorkspace("tasks", dict(load=_named_load(value)), module_name=f"{package}.tasks")
+              for package, value in [("a", 1), ("b", 2)]]
+
+
+class ResultCacheTest(TestCase):
+
+    def setUp(self) -> None:
+        calls.clear()
+
+    def test_fingerprint(self):
+        self.assertEqual(meta_fingerprint(dict(a=1, b=[1, 2])), meta_fingerprint(dict(b=[1, 2], a=1)))
+        self.assertNotEqual(meta_fingerprint(dict(a=1)), meta_fingerprint(dict(a=2)))
+        self.assertIsNone(meta_fingerprint(dict(a=object())))
+
+    def test_lru(self):
+        cache = ResultCache(max_entries=2)
+        for i in range(3):
+            cache.put(("t", str(i)), i)
+        self.assertEqual(2, len(cache))
+        self.assertEqual(1, cache.evictions)
+        self.assertIs(cache.get(("t", "0"), None), None)
+        self.assertEqual(2, cache.get(("t", "2")))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_max_bytes(self):
+        cache = ResultCache(max_bytes=1000)
+        cache.put(("t", "small"), b"0" * 100)
+        cache.put(("t", "large"), b"0" * 2000)
+        self.assertEqual(1, len(cache))
+        cache.put(("t", "medium"), b"0" * 900)
+        self.assertEqual(1, len(cache))
+        self.assertLessEqual(cache.size, 1000)
+
+    def test_iterator(self):
+        cache = ResultCache()
+        self.assertListEqual([0, 1, 2], list(cache.put(("t", ""), iter(range(3)))))
+        self.assertListEqual([0, 1, 2], list(cache.get(("t", ""))))
+        self.assertListEqual([0, 1, 2], list(cache.get(("t", ""))))
+
+    def test_large_iterator(self):
+        cache = ResultCache(max_bytes=1000)
+        produced = []
+        result = cache.put(("t", ""), (produced.append(i) or i for i in range(1000)))
+        self.assertLess(len(produced), 1000)
+        self.assertListEqual(list(range(1000)), list(result))
+        self.assertEqual(0, len(cache))
+
+    def _run(self, runner):
+        task_master = TaskMaster(runner)
+        for meta in [{}, {}, dict(counted_range=dict(stop=5))]:
+            result = task_master.execute(meta, counted_scale, workspace)
+            self.assertListEqual([10 * i for i in range(meta.get("counted_range", {}).get("stop", 10))],
+                                 list(result.data))
+        self.assertEqual(2, calls.count("counted_range"))
+        # counted_scale depends on uncached_scale, so it is never served from the cache
+        self.assertEqual(3, calls.count("counted_scale"))
+        self.assertEqual(1, runner.cache.hits)
+
+    def test_simple(self):
+        self._run(SimpleRunner(ResultCache()))
+
+    def test_threading(self):
+        self._run(ThreadingRunner(ResultCache()))
+
+    def test_async(self):
+        self._run(AsyncRunner(ResultCache()))
+
+    def test_same_short_module_names(self):
+        runner = SimpleRunner(ResultCache())
+        results = [TaskMaster(runner).execute({}, ws.find_task("load"), ws).data for ws in same_named]
+        self.assertEqual(results, [1, 2])
+        self.assertEqual(len(runner.cache), 2)
+
+    def test_without_cache(self):
+        task_master = TaskMaster(SimpleRunner())
+        for _ in range(2):
+            list(task_master.execute({}, int_scale).data)
@@ -0,0 +1,65 @@
+import io
+import os
+import json
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from stem.cli_main import stem_cli_main, write_result
+from stem.envelope import Envelope
+
+WORKSPACE = os.path.join(os.path.dirname(__file__), 'example_task.py')
+
+
+class RunTaskTest(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def run_cli(self, *args: str) -> bytes:
+        output = io.TextIOWrapper(io.BytesIO(), encoding='utf-8')
+        with redirect_stdout(output):
+            stem_cli_main(['-w', WORKSPACE, '--manifest-dir', self.directory.name, 'run', *args])
+        output.flush()
+        return output.buffer.getvalue()
+
+    def test_runners(self):
+        for runner in ['simple', 'thread', 'async', 'process']:
+            with self.subTest(runner):
+                output = self.run_cli('int_scale', '-r', runner, '-j', '2', '-m', '{"int_range": {"stop": 5}}')
+                self.assertEqual([json.loads(line) for line in output.splitlines()], [0, 10, 20, 30, 40])
+                output = self.run_cli('int_reduce', '-r', runner)
+                self.assertEqual(json.loads(output), 450)
+
+    def test_envelope_frames(self):
+        output = io.BytesIO(self.run_cli('int_scale', '-f', 'envelope'))
+        frames = []
+        while output.tell() < len(output.getvalue()):
+            frames.append(Envelope.read(output))
+        self.assertEqual([frame.meta['index'] for frame in frames], list(range(10)))
+        self.assertEqual([json.loads(frame.data) for frame in frames], list(range(0, 100, 10)))
+
+    def test_cache_dir(self):
+        cache_dir = os.path.join(self.directory.name, 'artifacts')
+        for _ in range(2):
+            self.assertEqual(json.loads(self.run_cli('int_reduce', '-c', cache_dir)), 450)
+        self.assertTrue(any(files for _, _, files in os.walk(cache_dir)))
+
+    def test_unknown_task(self):
+        with self.assertRaises(SystemExit):
+            self.run_cli('no_task')
+
+    def test_streamed(self):
+        output = io.StringIO()
+
+        def produced():
+            for i in range(3):
+                # the previous items are written before the next one is produced
+                self.assertEqual(output.getvalue().count('\n'), i)
+                yield i
+
+        write_result(produced(), 'produced', output=output)
+        self.assertEqual(output.getvalue(), '0\n1\n2\n')
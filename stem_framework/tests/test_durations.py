@@ -0,0 +1,93 @@
+import os
+import time
+import tempfile
+from unittest import TestCase, mock
+
+from stem.durations import DurationHistory, DEFAULT_PATH
+from stem.task import data, task
+from stem.task_master import TaskMaster
+from stem.task_runner import ThreadingRunner
+from stem.task_tree import TaskTree
+
+calls = []
+
+
+@data
+def short_leaf(meta):
+    calls.append("short_leaf")
+    return 1
+
+
+@data
+def chain_a(meta):
+    calls.append("chain_a")
+    return 1
+
+
+@task
+def chain_b(meta, chain_a):
+    return chain_a + 1
+
+
+@task
+def chain_c(meta, chain_b):
+    return chain_b + 1
+
+
+@task
+def chain_root(meta, short_leaf, chain_c):
+    return short_leaf + chain_c
+
+
+class DurationHistoryTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tree = TaskTree(chain_root)
+        self.history = DurationHistory(path=None, alpha=0.5)
+        for node in self.tree.root.topological_order:
+            self.history.record(node.path, 1.0)
+
+    def test_record(self):
+        history = DurationHistory(path=None, alpha=0.5)
+        self.assertEqual(1.0, history.estimate("unknown"))
+        history.record("a", 2.0)
+        history.record("a", 4.0)
+        self.assertEqual(3.0, history.estimate("a"))
+        self.assertEqual(3.0, history.estimate("unknown"))
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "durations.json")
+            history = DurationHistory(path)
+            history.record("a", 2.0)
+            history.save()
+            self.assertEqual(2.0, DurationHistory(path).estimate("a"))
+
+    def test_makespan(self):
+        self.assertEqual(4.0, self.history.critical_path(self.tree.root))
+        self.assertEqual(4.0, self.history.makespan(self.tree.root, max_workers=2))
+        self.assertEqual(5.0, self.history.makespan(self.tree.root, max_workers=1))
+        self.history.record(self.tree.root.dependencies[0].path, 9.0)
+        self.assertEqual(6.0, self.history.critical_path(self.tree.root))
+
+    def test_priority(self):
+        calls.clear()
+        runner = ThreadingRunner(max_workers=1, durations=self.history)
+        self.assertEqual(4, TaskMaster(runner).execute({}, chain_root).data)
+        self.assertListEqual(["chain_a", "short_leaf"], calls)
+
+    def test_queue_wait_not_recorded(self):
+        history = DurationHistory(path=None)
+        runner = ThreadingRunner(max_workers=1, durations=history)
+        with runner.create_executor() as executor:
+            executor.submit(time.sleep, 0.3)  # keeps the only worker busy
+            self.assertEqual(1, runner.run({}, TaskTree(short_leaf).root, executor=executor))
+        self.assertLess(history.estimate(TaskTree(short_leaf).root.path), 0.2)
+
+    def test_default_path(self):
+        self.assertEqual(DEFAULT_PATH, ThreadingRunner().durations.path)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "durations.json")
+            with mock.patch.object(ThreadingRunner, "DURATIONS_PATH", path):
+                TaskMaster(ThreadingRunner()).execute({}, chain_root).data
+                self.assertIn(self.tree.root.path, ThreadingRunner().durations)
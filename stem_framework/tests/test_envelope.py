@@ -1,7 +1,15 @@
 import io
-from unittest import TestCase
+import os
+import array
+import asyncio
+import tempfile
+from enum import IntEnum
+from dataclasses import dataclass
+from unittest import TestCase, mock
 
-from stem.envelope import Envelope
+import numpy as np
+
+from stem.envelope import Envelope, DataSource
 
 
 class TestEnvelope(TestCase):
@@ -15,3 +23,240 @@ class TestEnvelope(TestCase):
         envelope = Envelope.from_bytes(data)
         self.assertDictEqual(self.envelope.meta, envelope.meta)
         self.assertEqual(self.envelope.data, envelope.data)
+
+    def test_from_bytes_view(self):
+        buffer = bytearray(self.envelope.to_bytes())
+        envelope = Envelope.from_bytes(buffer)
+        self.assertIsInstance(envelope.data, memoryview)
+        buffer[-1:] = b'X'
+        self.assertEqual(envelope.data, b"012345678X")
+        copied = Envelope.from_bytes(self.envelope.to_bytes(), copy=True)
+        self.assertIsInstance(copied.data, bytes)
+        self.assertEqual(copied.data, self.data)
+
+    def test_read_into_buffer(self):
+        stream = io.BytesIO()
+        self.envelope.write_to(stream)
+        Envelope(dict(c=2), b"abc").write_to(stream)
+        self.assertEqual(stream.getvalue(), self.envelope.to_bytes() + Envelope(dict(c=2), b"abc").to_bytes())
+        stream.seek(0)
+        buffer = bytearray(64)
+        first = Envelope.read(stream, buffer)
+        self.assertDictEqual(first.meta, self.envelope.meta)
+        self.assertEqual(first.data, self.data)
+        second = Envelope.read(stream, buffer)
+        self.assertEqual(second.data, b"abc")
+        self.assertEqual(bytes(buffer[:3]), b"abc")
+        stream.seek(0)
+        self.assertEqual(Envelope.read(stream, bytearray(4)).data, self.data)
+
+    def test_truncated(self):
+        frame = self.envelope.to_bytes()
+        with self.assertRaises(EOFError):
+            Envelope.read(io.BytesIO(frame[:-1]))
+        with self.assertRaises(EOFError):
+            Envelope.from_bytes(frame[:-1])
+
+    def test_typed_data(self):
+        values = array.array('d', [1.0, 2.0, 3.0])
+        envelope = Envelope.from_bytes(Envelope(dict(), values).to_bytes())
+        self.assertEqual(len(envelope.data), 24)
+        self.assertEqual(envelope.data.cast('d').tolist(), values.tolist())
+
+    def test_async_read(self):
+        async def read():
+            reader = asyncio.StreamReader()
+            frame = self.envelope.to_bytes()
+            for i in range(0, len(frame), 7):
+                reader.feed_data(frame[i:i + 7])
+            reader.feed_eof()
+            return await Envelope.async_read(reader)
+
+        envelope = asyncio.run(read())
+        self.assertDictEqual(self.envelope.meta, envelope.meta)
+        self.assertEqual(envelope.data, self.data)
+
+    def test_stream_source(self):
+        chunks = [b"0123", bytearray(b"45"), memoryview(b"6789")]
+        streamed = Envelope(dict(a=1, b="b"), DataSource(chunks, length=10))
+        self.assertEqual(streamed.to_bytes(), self.envelope.to_bytes())
+        with tempfile.TemporaryFile() as file:
+            file.write(b"skip" + self.data)
+            file.seek(4)
+            output = io.BytesIO()
+            Envelope(dict(a=1, b="b"), DataSource(file, chunk_size=3)).write_to(output)
+        self.assertEqual(output.getvalue(), self.envelope.to_bytes())
+        with self.assertRaises(ValueError):
+            DataSource(iter(chunks))
+        with self.assertRaises(ValueError):
+            Envelope({}, DataSource(chunks, length=11)).to_bytes()
+
+    def test_read_stream(self):
+        stream = io.BytesIO(self.envelope.to_bytes() + Envelope(dict(c=2), b"abc").to_bytes())
+        envelope = Envelope.read_stream(stream, chunk_size=4)
+        self.assertDictEqual(envelope.meta, self.envelope.meta)
+        self.assertEqual(len(envelope.data), 10)
+        self.assertEqual(list(envelope.data), [b"0123", b"4567", b"89"])
+        self.assertEqual(Envelope.read(stream).data, b"abc")
+        stream.seek(0)
+        first = Envelope.read_stream(stream)
+        self.assertEqual(first.data.read(3), b"012")
+        first.data.drain()
+        self.assertEqual(Envelope.read(stream).data, b"abc")
+
+    def test_async_stream(self):
+        async def forward():
+            reader = asyncio.StreamReader()
+            reader.feed_data(self.envelope.to_bytes())
+            reader.feed_eof()
+            envelope = await Envelope.async_read_stream(reader, chunk_size=4)
+            output = io.BytesIO()
+
+            class Writer:
+                def write(self, data):
+                    output.write(data)
+
+                async def drain(self):
+                    pass
+
+            await Envelope(envelope.meta, envelope.data).async_write_to(Writer())
+            return output.getvalue()
+
+        self.assertEqual(asyncio.run(forward()), self.envelope.to_bytes())
+
+    def test_async_data_sync_write(self):
+        async def chunks():
+            yield self.data
+
+        async def stream():
+            reader = asyncio.StreamReader()
+            reader.feed_data(self.envelope.to_bytes())
+            reader.feed_eof()
+            return await Envelope.async_read_stream(reader)
+
+        for data in [DataSource(chunks(), length=10), asyncio.run(stream()).data]:
+            with self.subTest(data=type(data).__name__):
+                with self.assertRaisesRegex(TypeError, "async_write_to"):
+                    Envelope({}, data).to_bytes()
+                with self.assertRaisesRegex(TypeError, "async_write_to"):
+                    Envelope({}, data).write_to(io.BytesIO())
+
+    def test_spill(self):
+        first = Envelope(dict(a=1), self.data, spill_size=4)
+        second = Envelope(dict(a=2), b"abcdefgh", spill_size=4)
+        self.assertTrue(first.spilled and second.spilled)
+        self.assertEqual(first.data, self.data)
+        self.assertEqual(second.data, b"abcdefgh")
+        self.assertEqual(Envelope.from_bytes(first.to_bytes()).data, self.data)
+        self.assertFalse(Envelope(dict(), self.data, spill_size=10).spilled)
+        self.assertFalse(Envelope(dict(), memoryview(self.data), spill_size=4).spilled)
+        with first:
+            pass
+        self.assertFalse(first.spilled)
+        self.assertEqual(first.data, b'')
+
+    def test_read_spilled(self):
+        with mock.patch.object(Envelope, 'SPILL_SIZE', 4):
+            envelope = Envelope.read(io.BytesIO(self.envelope.to_bytes()))
+            self.assertFalse(self.envelope.spilled)
+        self.assertTrue(envelope.spilled)
+        self.assertEqual(envelope.data, self.data)
+        envelope.close()
+
+    def test_meta_formats(self):
+        meta = dict(a=1, text="it's", values=[1.5, None, True], nested=dict(b=b"raw"))
+        frame = Envelope(meta, self.data, meta_format='binary').to_bytes()
+        self.assertEqual(frame[6:8], b'B.')
+        envelope = Envelope.from_bytes(frame)
+        self.assertEqual(envelope.meta_format, 'binary')
+        self.assertDictEqual(envelope.meta, meta)
+        self.assertEqual(Envelope.read(io.BytesIO(frame)).meta, meta)
+        self.assertEqual(self.envelope.to_bytes()[6:8], b'..')
+        self.assertEqual(Envelope.from_bytes(Envelope(dict(text="it's"), b"").to_bytes()).meta, dict(text="it's"))
+        with self.assertRaises(ValueError):
+            Envelope(meta, meta_format='xml')
+        with self.assertRaises(ValueError):
+            Envelope.from_bytes(frame[:6] + b'X' + frame[7:])
+
+    def test_binary_meta(self):
+        class Mode(IntEnum):
+            FAST = 2
+
+        meta = dict(f=np.float64(0.5), i=np.int32(-7), b=np.bool_(True), mode=Mode.FAST, pair=(1, 2),
+                    big=-2 ** 100, nested=[dict(x=np.float32(0.25))])
+        decoded = Envelope.from_bytes(Envelope(meta, meta_format='binary').to_bytes()).meta
+        self.assertEqual(decoded, dict(f=0.5, i=-7, b=True, mode=2, pair=[1, 2], big=-2 ** 100,
+                                       nested=[dict(x=0.25)]))
+        self.assertEqual([type(decoded[key]) for key in ['f', 'i', 'b', 'mode']], [float, int, bool, int])
+        plain = dict(a=(1, "b"), c=[None, 1.5])
+        self.assertEqual(Envelope.from_bytes(Envelope(plain, meta_format='binary').to_bytes()).meta,
+                         Envelope.from_bytes(Envelope(plain).to_bytes()).meta)
+        for unsupported in [dict(s={1}), {1: "a"}, dict(c=1j)]:
+            with self.subTest(meta=unsupported), self.assertRaises(TypeError):
+                Envelope(unsupported, meta_format='binary').to_bytes()
+        encoded = Envelope(meta, meta_format='binary').to_bytes()
+        for corrupted in [encoded[:-1], encoded + b'N', encoded[:20] + b'?' + encoded[21:]]:
+            with self.subTest(frame=corrupted[20:24]), self.assertRaises(ValueError):
+                Envelope.from_bytes(corrupted[:8] + (len(corrupted) - 20).to_bytes(4, 'big') + corrupted[12:])
+
+    def test_legacy_meta(self):
+        meta = str(dict(a=1)).encode()
+        frame = b'~#DF02..' + len(meta).to_bytes(4, 'big') + (0).to_bytes(4, 'big') + b'~#\r\n' + meta
+        self.assertDictEqual(Envelope.from_bytes(frame).meta, dict(a=1))
+
+    def test_object_meta(self):
+        @dataclass
+        class Inner:
+            x: int
+
+        @dataclass
+        class Outer:
+            inner: Inner
+            name: str
+
+        envelope = Envelope.from_bytes(Envelope(Outer(Inner(1), "o"), meta_format='binary').to_bytes())
+        self.assertDictEqual(envelope.meta, dict(inner=dict(x=1), name="o"))
+
+    def test_compression(self):
+        data = b"0123456789" * 10000
+        for compression, tag in [('zlib', b'z'), ('lzma', b'x'), ('bz2', b'b')]:
+            with self.subTest(compression=compression):
+                envelope = Envelope(dict(a=1), data, compression=compression, compression_level=1)
+                frame = envelope.to_bytes()
+                self.assertEqual(frame[7:8], tag)
+                self.assertLess(len(frame), len(data) // 10)
+                received = Envelope.from_bytes(frame)
+                self.assertEqual(received.compression, compression)
+                self.assertEqual(received.data, data)
+                self.assertEqual(Envelope.read(io.BytesIO(frame)).data, data)
+                with self.assertRaises(ValueError):
+                    Envelope.from_bytes(frame[:-10] + b'\0' * 10)
+        noise = os.urandom(100000)
+        self.assertEqual(Envelope(dict(), noise, compression='zlib').to_bytes()[7:8], b'.')
+        with self.assertRaises(ValueError):
+            Envelope(dict(), data, compression='zip')
+
+    def test_compressed_stream(self):
+        data = b"0123456789" * 100000
+        source = DataSource((data[i:i + 4096] for i in range(0, len(data), 4096)), length=len(data))
+        with mock.patch.object(Envelope, 'SPILL_SIZE', 1000):
+            frame = Envelope(dict(a=1), source, compression='zlib').to_bytes()
+            self.assertEqual(Envelope.read(io.BytesIO(frame)).data, data)
+        self.assertLess(len(frame), len(data) // 10)
+        envelope = Envelope.read_stream(io.BytesIO(frame), chunk_size=100)
+        self.assertEqual(envelope.data.read(5), b"01234")
+        self.assertEqual(envelope.data.read(7), b"5678901")
+        self.assertEqual(len(b''.join(envelope.data)), len(data) - 12)
+        forwarded = Envelope(dict(a=1), Envelope.read_stream(io.BytesIO(frame)).data).to_bytes()
+        self.assertEqual(forwarded, frame)
+
+        async def read():
+            reader = asyncio.StreamReader()
+            reader.feed_data(frame + frame)
+            reader.feed_eof()
+            first = await Envelope.async_read_stream(reader, chunk_size=100)
+            chunks = [chunk async for chunk in first.data]
+            second = await Envelope.async_read_stream(reader)
+            return b''.join(chunks), await second.data.read()
+
+        self.assertEqual(asyncio.run(read()), (data, data))
@@ -0,0 +1,75 @@
+from unittest import TestCase
+
+from stem.task import data, task
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner
+
+calls = []
+
+
+@data
+def inc_range(meta):
+    calls.append("inc_range")
+    return iter(range(meta.get("stop", 10)))
+
+
+@data
+def inc_factor(meta):
+    calls.append("inc_factor")
+    return meta.get("factor", 10)
+
+
+@task
+def inc_scale(meta, inc_range, inc_factor):
+    calls.append("inc_scale")
+    return [inc_factor * i for i in inc_range]
+
+
+@task
+def inc_sum(meta, inc_scale):
+    calls.append("inc_sum")
+    return sum(inc_scale) + meta.get("offset", 0)
+
+
+class IncrementalTest(TestCase):
+
+    def _check(self, runner):
+        task_master = TaskMaster(runner, incremental=True)
+
+        def execute(meta):
+            calls.clear()
+            return task_master.execute(meta, inc_sum).data
+
+        self.assertEqual(450, execute({}))
+        self.assertEqual(4, len(calls))
+        self.assertEqual(450, execute({}))
+        self.assertListEqual([], calls)
+
+        meta = dict(inc_scale=dict(inc_range=dict(stop=5)))
+        self.assertEqual(100, execute(meta))
+        self.assertListEqual(["inc_range", "inc_scale", "inc_sum"], calls)
+
+        meta = dict(inc_scale=dict(inc_range=dict(stop=5, unused=1)))
+        self.assertEqual(100, execute(meta))
+        self.assertListEqual(["inc_range"], calls)
+
+        meta["offset"] = 1
+        self.assertEqual(101, execute(meta))
+        self.assertListEqual(["inc_sum"], calls)
+        self.assertEqual(4, len(task_master.history))
+
+    def test_simple(self):
+        self._check(SimpleRunner())
+
+    def test_threading(self):
+        self._check(ThreadingRunner())
+
+    def test_async(self):
+        self._check(AsyncRunner())
+
+    def test_disabled(self):
+        task_master = TaskMaster(SimpleRunner())
+        for _ in range(2):
+            calls.clear()
+            self.assertEqual(450, task_master.execute({}, inc_sum).data)
+            self.assertEqual(4, len(calls))
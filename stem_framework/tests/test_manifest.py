@@ -0,0 +1,101 @@
+import io
+import os
+import sys
+import uuid
+import tempfile
+from contextlib import redirect_stdout
+from unittest import TestCase
+
+from stem.cli_main import stem_cli_main
+from stem.manifest import open_workspace
+
+SOURCE = """
+import os
+with open(os.path.join(os.path.dirname(__file__), 'imports.log'), 'a') as log:
+    log.write('imported\\n')
+
+from stem.task import data, task
+
+
+@data
+def manifest_range(meta):
+    return range(3)
+
+
+@task
+def manifest_sum(meta, manifest_range):
+    return sum(manifest_range)
+"""
+
+EXTRA = """
+
+@task
+def manifest_max(meta, manifest_range):
+    return max(manifest_range)
+"""
+
+
+class ManifestTest(TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.module_name = 'manifest_ws_' + uuid.uuid4().hex
+        self.path = os.path.join(self.directory.name, self.module_name + '.py')
+        self.manifest_dir = os.path.join(self.directory.name, 'manifests')
+        with open(self.path, 'w') as file:
+            file.write(SOURCE)
+
+    def tearDown(self) -> None:
+        sys.modules.pop(self.module_name, None)
+        self.directory.cleanup()
+
+    def imports(self) -> int:
+        with open(os.path.join(self.directory.name, 'imports.log')) as log:
+            return len(log.readlines())
+
+    def reopen(self):
+        sys.modules.pop(self.module_name, None)
+        return open_workspace(self.path, self.manifest_dir)
+
+    def test_manifest(self):
+        workspace = open_workspace(self.path, self.manifest_dir)
+        self.assertTrue(workspace.loaded)
+        self.assertEqual(self.imports(), 1)
+
+        workspace = self.reopen()
+        self.assertFalse(workspace.loaded)
+        self.assertEqual(workspace.name, self.module_name)
+        self.assertIn('manifest_sum', workspace.structure()['tasks'])
+        self.assertTrue(workspace.has_task('manifest_sum'))
+        self.assertFalse(workspace.has_task('manifest_max'))
+        self.assertEqual(self.imports(), 1)
+
+        # a touched file with the same content keeps the manifest
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertFalse(self.reopen().loaded)
+        self.assertEqual(self.imports(), 1)
+
+        with open(self.path, 'a') as file:
+            file.write(EXTRA)
+        workspace = self.reopen()
+        self.assertTrue(workspace.loaded)
+        self.assertTrue(workspace.has_task('manifest_max'))
+        self.assertEqual(self.imports(), 2)
+
+        workspace = self.reopen()
+        self.assertFalse(workspace.loaded)
+        self.assertEqual(list(workspace.find_task('manifest_range').transform({})), [0, 1, 2])
+        self.assertTrue(workspace.loaded)
+
+    def test_cli(self):
+        for _ in range(2):
+            sys.modules.pop(self.module_name, None)
+            output = io.StringIO()
+            with redirect_stdout(output):
+                stem_cli_main(['-w', self.path, '--manifest-dir', self.manifest_dir, 'structure'])
+            self.assertIn('manifest_sum', output.getvalue())
+        self.assertEqual(self.imports(), 1)
+        with self.assertRaises(SystemExit):
+            stem_cli_main(['-w', self.path, '--manifest-dir', self.manifest_dir, 'run', 'no_task'])
+        self.assertEqual(self.imports(), 1)
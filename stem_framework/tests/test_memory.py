@@ -0,0 +1,111 @@
+import time
+import tracemalloc
+from threading import Lock
+from unittest import TestCase
+
+import numpy as np
+
+from stem.memory import MemoryAccount
+from stem.task import data, task
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner
+
+MB = 1024 * 1024
+
+running = 0
+max_running = 0
+running_lock = Lock()
+
+
+@data
+def mem_source(meta):
+    return np.ones(MB // 8)
+
+
+@task
+def mem_double(meta, mem_source):
+    return mem_source * 2
+
+
+@task
+def mem_triple(meta, mem_double):
+    return mem_double * 3
+
+
+@task
+def mem_total(meta, mem_triple):
+    return float(mem_triple.sum())
+
+
+def _big(meta):
+    global running, max_running
+    with running_lock:
+        running += 1
+        max_running = max(max_running, running)
+    time.sleep(0.05)
+    with running_lock:
+        running -= 1
+    return np.zeros(MB // 8)
+
+
+@data
+def mem_big_0(meta):
+    return _big(meta)
+
+
+@data
+def mem_big_1(meta):
+    return _big(meta)
+
+
+@data
+def mem_big_2(meta):
+    return _big(meta)
+
+
+@task
+def mem_join(meta, mem_big_0, mem_big_1, mem_big_2):
+    return len(mem_big_0) + len(mem_big_1) + len(mem_big_2)
+
+
+class MemoryAccountTest(TestCase):
+
+    def test_release_after_last_consumer(self):
+        for runner_type in [SimpleRunner, ThreadingRunner, AsyncRunner]:
+            with self.subTest(runner=runner_type.__name__):
+                memory = MemoryAccount()
+                result = TaskMaster(runner_type(memory=memory)).execute({}, mem_total)
+                self.assertEqual(result.data, 6 * MB // 8)
+                self.assertEqual(memory.live, 0)
+                self.assertGreaterEqual(memory.peak_live, MB)
+                self.assertLess(memory.peak_live, 3 * MB)
+                self.assertGreaterEqual(memory.sizes['test_memory.mem_triple'], MB)
+
+    def test_trace_peaks(self):
+        with MemoryAccount(trace=True) as memory:
+            TaskMaster(SimpleRunner(memory=memory)).execute({}, mem_total).data
+            self.assertTrue(tracemalloc.is_tracing())
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertGreaterEqual(memory.peaks['test_memory.mem_double'], MB)
+        self.assertGreaterEqual(memory.estimate('test_memory.mem_double'), MB)
+        self.assertEqual(memory.estimate('unknown'), 0)
+
+    def test_close_keeps_foreign_tracing(self):
+        tracemalloc.start()
+        try:
+            with MemoryAccount(trace=True) as memory:
+                TaskMaster(SimpleRunner(memory=memory)).execute({}, mem_total).data
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+    def test_budget(self):
+        global max_running
+        memory = MemoryAccount(budget=MB + MB // 2)
+        TaskMaster(ThreadingRunner(memory=memory)).execute({}, mem_join).data
+        max_running = 0
+        # the sizes are known after the first run, so the big nodes can not run together
+        result = TaskMaster(ThreadingRunner(memory=memory)).execute({}, mem_join)
+        self.assertEqual(result.data, 3 * MB // 8)
+        self.assertEqual(max_running, 1)
+        self.assertEqual(memory.live, 0)
@@ -1,7 +1,9 @@
 import dataclasses
 from unittest import TestCase
 
-from stem.meta import MetaVerification, update_meta, get_meta_attr
+from typing import Optional
+
+from stem.meta import MetaVerification, update_meta, get_meta_attr, compile_specification
 
 
 @dataclasses.dataclass
@@ -11,6 +13,13 @@ class Example:
     c: list = dataclasses.field(default_factory=list)
 
 
+@dataclasses.dataclass
+class Outer:
+    name: str = ""
+    inner: Example = dataclasses.field(default_factory=Example)
+    limit: Optional[int] = None
+
+
 class CoreTest(TestCase):
 
     def test_get_meta_attr(self):
@@ -44,3 +53,35 @@ class CoreTest(TestCase):
 
         verification = MetaVerification.verify(example_dict, specification)
         self.assertFalse(verification.checked_success)
+
+    def test_nested_verify(self):
+        specification = (("name", str), ("inner", (("a", int), ("b", (int, float)))))
+        verification = MetaVerification.verify({"name": "x", "inner": {"a": 1, "b": 2}}, specification)
+        self.assertTrue(verification.checked_success)
+        verification = MetaVerification.verify({"name": "x", "inner": {"a": "1", "b": 2}}, specification)
+        self.assertFalse(verification.checked_success)
+        nested, = verification.error
+        self.assertEqual(nested.error[0].required_key, "a")
+
+        self.assertTrue(MetaVerification.verify(Outer(), Outer).checked_success)
+        self.assertTrue(MetaVerification.verify({"name": "x", "inner": {"a": 1, "b": 1.0, "c": []}, "limit": 3},
+                                                Outer).checked_success)
+        self.assertFalse(MetaVerification.verify({"name": "x", "inner": {"a": 1.0, "b": 1.0, "c": []}},
+                                                 Outer).checked_success)
+        self.assertFalse(MetaVerification.verify({"name": "x", "inner": {"a": 1, "b": 1.0, "c": []}, "limit": "3"},
+                                                 Outer).checked_success)
+        self.assertTrue(MetaVerification.verify({"inner": {"a": 1}}, {"inner": {"a": int}}).checked_success)
+
+    def test_compiled_once(self):
+        specification = (("a", int), ("b", (int, float)))
+        self.assertIs(compile_specification(specification), compile_specification(specification))
+        self.assertIs(compile_specification(Example), compile_specification(Example))
+        example = Example()
+        self.assertIs(compile_specification(example), compile_specification(example))
+
+    def test_verify_many(self):
+        metas = [{"a": i, "b": 0.5} if i % 3 else {"a": str(i), "b": 0.5} for i in range(3000)]
+        verifications = MetaVerification.verify_many(metas, (("a", int), ("b", (int, float))))
+        self.assertEqual(len(verifications), 3000)
+        self.assertEqual([v.checked_success for v in verifications], [i % 3 != 0 for i in range(3000)])
+        self.assertTrue(all(v.checked_success for v in MetaVerification.verify_many(metas, None)))
@@ -0,0 +1,29 @@
+from unittest import TestCase
+
+import numpy as np
+
+from stem.serialization import pack, unpack
+
+
+class SerializationTest(TestCase):
+
+    def test_small(self):
+        packed = pack(dict(a=1, b=[1, 2]))
+        self.assertIsNone(packed.spill_path)
+        self.assertDictEqual(dict(a=1, b=[1, 2]), unpack(packed))
+
+    def test_iterator(self):
+        packed = pack(map(lambda x: x * 10, range(3)))
+        self.assertTrue(packed.is_iterator)
+        self.assertListEqual([0, 10, 20], list(unpack(packed)))
+
+    def test_spill(self):
+        arrays = [np.arange(1024 * 1024, dtype="float32"), np.ones((4, 4))]
+        packed = pack(arrays)
+        self.assertIsNotNone(packed.spill_path)
+        self.assertLess(len(packed.payload), 1024)
+        received = unpack(packed)
+        for array, received_array in zip(arrays, received):
+            np.testing.assert_array_equal(array, received_array)
+        received[0][0] = -1
+        self.assertEqual(-1, received[0][0])
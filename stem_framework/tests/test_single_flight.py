@@ -0,0 +1,84 @@
+import time
+from threading import Lock
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+
+from stem.task import data, task
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner
+
+calls = []
+calls_lock = Lock()
+
+
+@data
+def sf_slow(meta):
+    with calls_lock:
+        calls.append("sf_slow")
+    time.sleep(0.2)
+    return iter(range(meta.get("stop", 5)))
+
+
+@task
+def sf_sum(meta, sf_slow):
+    return sum(sf_slow)
+
+
+@task
+def sf_max(meta, sf_slow):
+    return max(sf_slow)
+
+
+@data
+def sf_broken(meta):
+    time.sleep(0.2)
+    raise ValueError("broken")
+
+
+@task
+def sf_broken_user(meta, sf_broken):
+    return sf_broken
+
+
+class SingleFlightTest(TestCase):
+
+    def _check(self, runner):
+        task_master = TaskMaster(runner, single_flight=True)
+        calls.clear()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            total = executor.submit(lambda: task_master.execute({}, sf_sum).data)
+            maximum = executor.submit(lambda: task_master.execute({}, sf_max).data)
+            self.assertEqual(total.result(), 10)
+            self.assertEqual(maximum.result(), 4)
+        self.assertEqual(calls, ["sf_slow"])
+        self.assertEqual(len(task_master.flights), 0)
+
+        # different meta slices are different instances
+        calls.clear()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            total = executor.submit(lambda: task_master.execute({"sf_slow": {"stop": 3}}, sf_sum).data)
+            maximum = executor.submit(lambda: task_master.execute({}, sf_max).data)
+            self.assertEqual(total.result(), 3)
+            self.assertEqual(maximum.result(), 4)
+        self.assertEqual(calls, ["sf_slow", "sf_slow"])
+
+    def test_simple_runner(self):
+        self._check(SimpleRunner())
+
+    def test_threading_runner(self):
+        self._check(ThreadingRunner())
+
+    def test_async_runner(self):
+        self._check(AsyncRunner())
+
+    def test_failure_reaches_followers(self):
+        task_master = TaskMaster(ThreadingRunner(), single_flight=True)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = [executor.submit(lambda: task_master.execute({}, sf_broken_user).data) for _ in range(2)]
+            for result in results:
+                with self.assertRaises(ValueError):
+                    result.result()
+        self.assertEqual(len(task_master.flights), 0)
+
+    def test_disabled_by_default(self):
+        self.assertIsNone(TaskMaster(SimpleRunner()).flights)
@@ -1,10 +1,24 @@
 from functools import reduce
 from unittest import TestCase
 
-from stem.task import Task, MapTask, FilterTask, ReduceTask
+from stem.task import Task, MapTask, FilterTask, ReduceTask, ParallelMapTask, data
 from tests.example_task import IntRange, int_range, int_scale, data_scale
 
 
+consumed = []
+
+
+def square(x):
+    return x * x
+
+
+@data
+def long_range(meta):
+    for i in range(1000):
+        consumed.append(i)
+        yield i
+
+
 class TaskTest(TestCase):
 
     def test_datatask(self):
@@ -46,4 +60,23 @@ class TaskTest(TestCase):
         self.assertEqual(reduce(lambda acc, x: acc + x, range(0, 10, 1)),
                          task.transform({}, int_range=int_range.data({})))
 
+    def test_parallel_map_task(self):
+        task = ParallelMapTask(lambda x: x * 10, int_range, max_workers=3, chunk_size=2)
+        self.assertEqual(task.name, "parallel_map_int_range")
+        self.assertListEqual(list(range(0, 100, 10)), list(task.transform({}, int_range=int_range.data({}))))
+
+    def test_parallel_map_task_unordered(self):
+        task = ParallelMapTask(lambda x: x * 10, int_range, chunk_size=3, max_in_flight=2, ordered=False)
+        self.assertListEqual(list(range(0, 100, 10)), sorted(task.transform({"stop": 10})))
+
+    def test_parallel_map_task_processes(self):
+        task = ParallelMapTask(square, int_range, max_workers=2, chunk_size=4, processes=True)
+        self.assertListEqual([i * i for i in range(10)], list(task.transform({})))
 
+    def test_parallel_map_task_backpressure(self):
+        consumed.clear()
+        task = ParallelMapTask(lambda x: x, long_range, chunk_size=10, max_in_flight=2)
+        stream = task.transform({})
+        next(stream)
+        self.assertLessEqual(len(consumed), 3 * 10 + 1)
+        stream.close()
@@ -1,7 +1,11 @@
-from unittest import TestCase
+import time
+from threading import Lock
+from unittest import TestCase, mock
 
-from stem.task_master import TaskMaster
-from stem.task_runner import SimpleRunner
+from stem.task import data, task
+from stem.task_master import TaskMaster, TaskStatus
+from stem.single_flight import SingleFlight
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner
 from tests.example_task import int_scale
 
 
@@ -14,4 +18,90 @@ class SimpleRunnerTest(TestCase):
         task_master = TaskMaster(self.runner)
         result = task_master.execute({}, int_scale)
         for i, r in zip(range(0, 100, 10), result.lazy_data()):
-            self.assertEqual(i, r)
\ No newline at end of file
+            self.assertEqual(i, r)
+
+
+em_calls = []
+em_running = [0, 0]
+em_lock = Lock()
+
+
+@data
+def em_base(meta):
+    em_calls.append("em_base")
+    time.sleep(0.01)
+    return meta.get("n", 6)
+
+
+def em_divided(meta, em_base):
+    with em_lock:
+        em_running[0] += 1
+        em_running[1] = max(em_running)
+    time.sleep(0.01)
+    with em_lock:
+        em_running[0] -= 1
+    return em_base // meta["factor"]
+
+
+em_divided = task(em_divided, specification=(("factor", int),))
+
+
+class ExecuteManyTest(TestCase):
+
+    def test_execute_many(self):
+        for runner in (SimpleRunner(), ThreadingRunner(), AsyncRunner()):
+            with self.subTest(runner=type(runner).__name__):
+                em_calls.clear()
+                em_running[:] = [0, 0]
+                metas = [{"factor": k} for k in range(40)] + [{"factor": "2"}]
+                results = list(TaskMaster(runner).execute_many(metas, em_divided, max_concurrency=4))
+
+                self.assertEqual(sorted(i for i, _ in results), list(range(41)))
+                # errors of verification go first
+                self.assertEqual(results[0][0], 40)
+                self.assertEqual(results[0][1].status, TaskStatus.META_ERROR)
+                results = dict(results)
+                self.assertEqual(results[0].status, TaskStatus.INVOCATION_ERROR)
+                self.assertRaises(ZeroDivisionError, lambda: results[0].data)
+                for k in range(1, 40):
+                    self.assertEqual(results[k].status, TaskStatus.CONTAINS_DATA)
+                    self.assertEqual(results[k].data, 6 // k)
+                # the shared dependency is computed once for the batch
+                self.assertEqual(em_calls, ["em_base"])
+                self.assertLessEqual(em_running[1], 4)
+
+    def test_execute_many_shared_executor(self):
+        runner = ThreadingRunner(max_workers=2)
+        executors = []
+        create_executor = runner.create_executor
+        runner.create_executor = lambda: executors.append(create_executor()) or executors[-1]
+        em_running[:] = [0, 0]
+        results = dict(TaskMaster(runner).execute_many([{"factor": k} for k in range(1, 17)], em_divided))
+        self.assertEqual([results[k].data for k in range(16)], [6 // k for k in range(1, 17)])
+        self.assertEqual(len(executors), 1)
+        self.assertLessEqual(em_running[1], 2)
+
+    def test_execute_many_releases_sub_results(self):
+        batches = []
+
+        class RecordingFlight(SingleFlight):
+            def __init__(self):
+                super().__init__()
+                batches.append(self)
+                self.retained = []
+
+            def release(self, keys):
+                super().release(keys)
+                self.retained.append(len(self))
+
+        em_calls.clear()
+        # em_base gets n=0 in the even metas and a slice of its own in the odd ones
+        metas = [{"factor": k, "em_base": {"n": 6 if k % 2 == 0 else k}} for k in range(1, 9)]
+        with mock.patch("stem.task_master.SingleFlight", RecordingFlight):
+            results = dict(TaskMaster(SimpleRunner()).execute_many(metas, em_divided,
+                                                                         max_concurrency=1))
+        self.assertEqual([results[i].data for i in range(8)], [1, 3, 1, 1, 1, 1, 1, 0])
+        self.assertEqual(len(em_calls), 5)
+        flights, = batches
+        # only the em_base shared by the even metas is kept, from the first to the last of them
+        self.assertEqual(flights.retained, [0, 1, 1, 1, 1, 1, 1, 0])
@@ -1,8 +1,46 @@
+import asyncio
+import threading
 from unittest import TestCase
 
+from stem.task import data, task
 from stem.task_master import TaskMaster
 from stem.task_runner import SimpleRunner, TaskRunner, ThreadingRunner, AsyncRunner, ProcessingRunner
-from tests.example_task import int_scale
+from stem.workspace import LocalWorkspace
+from tests.example_task import int_scale, float_reduce
+from tests.example_workspace import IntWorkspace
+
+calls = []
+
+
+@data
+def diamond_source(meta):
+    calls.append(threading.current_thread().name)
+    return iter(range(5))
+
+
+@task
+def diamond_left(meta, diamond_source):
+    return sum(diamond_source)
+
+
+@task
+def diamond_right(meta, diamond_source):
+    return max(diamond_source)
+
+
+@task
+def diamond(meta, diamond_left, diamond_right):
+    return diamond_left, diamond_right
+
+
+@data
+def adhoc_src(meta):
+    return [1, 2, 3, 4]
+
+
+@task
+def adhoc_tot(meta, adhoc_src):
+    return sum(adhoc_src)
 
 
 class RunnerTest(TestCase):
@@ -27,4 +65,133 @@ class RunnerTest(TestCase):
 
     def test_process(self):
         runner = ProcessingRunner()
-        self._run(runner)
\ No newline at end of file
+        self._run(runner)
+
+    def test_process_chain(self):
+        task_master = TaskMaster(ProcessingRunner(max_workers=2))
+        self.assertAlmostEqual(TaskMaster().execute({}, float_reduce).data,
+                               task_master.execute({}, float_reduce).data, places=3)
+
+    def test_process_workspace(self):
+        task_master = TaskMaster(ProcessingRunner(max_workers=2))
+        result = task_master.execute({}, IntWorkspace.int_range_from_class)
+        self.assertListEqual(list(range(10)), list(result.data))
+
+    def test_process_adhoc_workspace(self):
+        # the workspace has no module, the tasks are found as globals of this module
+        workspace = LocalWorkspace('adhoc', tasks=dict(adhoc_src=adhoc_src, adhoc_tot=adhoc_tot))
+        result = TaskMaster(ProcessingRunner(max_workers=2)).execute({}, adhoc_tot, workspace)
+        self.assertEqual(10, result.data)
+
+
+class ThreadingRunnerTest(TestCase):
+
+    def test_exactly_once(self):
+        calls.clear()
+        result = TaskMaster(ThreadingRunner(max_workers=2)).execute({}, diamond)
+        self.assertTupleEqual((10, 4), result.data)
+        self.assertEqual(1, len(calls))
+
+    def test_single_worker(self):
+        runner = ThreadingRunner(max_workers=1)
+        self.assertAlmostEqual(TaskMaster().execute({}, float_reduce).data,
+                               TaskMaster(runner).execute({}, float_reduce).data, places=3)
+
+    def test_shared_iterator(self):
+        calls.clear()
+        meta = dict(diamond_left=dict(diamond_source={}), diamond_right=dict(diamond_source={}))
+        result = TaskMaster(ThreadingRunner()).execute(meta, diamond)
+        self.assertTupleEqual((10, 4), result.data)
+        self.assertEqual(1, len(calls))
+
+
+barrier = threading.Barrier(2, timeout=5)
+
+
+@data
+def blocking_left(meta):
+    return barrier.wait() >= 0
+
+
+@data
+def blocking_right(meta):
+    return barrier.wait() >= 0
+
+
+@data
+async def async_scale(meta):
+    await asyncio.sleep(0)
+    return 10
+
+
+@data
+async def async_range(meta):
+    for i in range(meta.get("stop", 10)):
+        await asyncio.sleep(0)
+        yield i
+
+
+@task
+def sync_scale(meta, async_range, async_scale):
+    return [async_scale * i for i in async_range]
+
+
+@task
+async def async_sum(meta, async_range):
+    return sum([i async for i in async_range])
+
+
+@task
+def lazy_double(meta, async_range):
+    return (x * 2 for x in async_range)
+
+
+@task
+async def lazy_total(meta, lazy_double):
+    return sum(lazy_double)
+
+
+@task
+def blocking_pair(meta, blocking_left, blocking_right):
+    return blocking_left and blocking_right
+
+
+@task
+def async_pair(meta, sync_scale, async_sum):
+    return sync_scale, async_sum
+
+
+class AsyncRunnerTest(TestCase):
+
+    def test_offload(self):
+        barrier.reset()
+        self.assertTrue(TaskMaster(AsyncRunner()).execute({}, blocking_pair).data)
+
+    def test_streams(self):
+        sync_result, async_result = TaskMaster(AsyncRunner()).execute({}, async_pair).data
+        self.assertListEqual([10 * i for i in range(10)], sync_result)
+        self.assertEqual(45, async_result)
+
+    def test_stream_to_sync_task(self):
+        result = TaskMaster(AsyncRunner()).execute({}, sync_scale)
+        self.assertListEqual([10 * i for i in range(10)], result.data)
+
+    def test_lazy_iterator_to_async_task(self):
+        # the generator pulls the async stream through the loop, so the async task must not iterate it there
+        self.assertEqual(90, TaskMaster(AsyncRunner()).execute({}, lazy_total).data)
+
+    def test_async_generator_result(self):
+        result = TaskMaster(AsyncRunner()).execute(dict(stop=3), async_range)
+        self.assertListEqual([0, 1, 2], list(result.data))
+
+    def test_simple_runner(self):
+        self.assertListEqual([10 * i for i in range(10)],
+                             TaskMaster(SimpleRunner()).execute({}, sync_scale).data)
+
+    def test_stream_to_async_task_in_sync_runners(self):
+        # the stream is collected outside an event loop and given to async_sum as an async iterator again
+        for runner in [SimpleRunner(), ThreadingRunner(), ProcessingRunner(max_workers=2)]:
+            with self.subTest(runner=type(runner).__name__):
+                sync_result, async_result = TaskMaster(runner).execute({}, async_pair).data
+                self.assertListEqual([10 * i for i in range(10)], sync_result)
+                self.assertEqual(45, async_result)
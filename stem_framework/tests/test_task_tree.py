@@ -1,8 +1,15 @@
 from unittest import TestCase
 
 
-from stem.task_tree import TaskTree
-from .example_task import int_range, int_scale
+from stem.task import task
+from stem.task_tree import TaskTree, TaskNode
+from stem.workspace import LocalWorkspace
+from .example_task import int_range, int_scale, int_reduce, float_scale, float_reduce, data_scale
+
+
+@task
+def int_diamond(meta, int_scale, int_reduce):
+    return int_reduce
 
 
 class TaskTreeTest(TestCase):
@@ -11,3 +18,34 @@ class TaskTreeTest(TestCase):
 
     def test_task_tree(self):
         self.assertEqual(self.task_node.dependencies[0].task, int_range)
+
+    def test_shared_nodes(self):
+        workspace = LocalWorkspace("diamond", dict(int_range=int_range, data_scale=data_scale,
+                                                   int_scale=int_scale, int_reduce=int_reduce))
+        tree = TaskTree(int_diamond, workspace)
+        scale_node, reduce_node = tree.root.dependencies
+        self.assertIs(reduce_node.dependencies[0], scale_node)
+        self.assertEqual(4 + 1, len(tree))
+        self.assertIs(tree.resolve_node(int_scale, workspace), scale_node)
+
+    def test_topological_order(self):
+        tree = TaskTree(float_reduce)
+        order = tree.root.topological_order
+        self.assertIs(order[-1], tree.root)
+        position = {id(node): i for i, node in enumerate(order)}
+        for node in order:
+            for dependency in node.dependencies:
+                self.assertLess(position[id(dependency)], position[id(node)])
+        self.assertEqual(len(order), len(tree.order))
+
+    def test_resolve_node(self):
+        tree = TaskTree(float_reduce)
+        node = tree.resolve_node(float_scale, tree.root.workspace)
+        self.assertIs(node, tree.root.dependencies[0])
+        self.assertIs(tree.resolve_node(float_reduce), tree.root)
+
+    def test_unresolved(self):
+        workspace = LocalWorkspace("broken", dict(int_scale=int_scale, int_range=int_range))
+        node = TaskNode(int_reduce, workspace)
+        self.assertTrue(node.has_dependence_errors)
+        self.assertListEqual(["data_scale"], node.unresolved_dependencies)
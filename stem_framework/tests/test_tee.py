@@ -0,0 +1,105 @@
+from threading import Thread
+from unittest import TestCase
+
+from stem.task import data, task
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner
+from stem.tee import SharedTee
+
+pulled = []
+
+
+def counted(n):
+    for i in range(n):
+        pulled.append(i)
+        yield i
+
+
+@data
+def tee_range(meta):
+    return counted(meta.get("stop", 1000))
+
+
+@task
+def tee_sum(meta, tee_range):
+    return sum(tee_range)
+
+
+@task
+def tee_count(meta, tee_range):
+    return sum(1 for _ in tee_range)
+
+
+@task
+def tee_mean(meta, tee_sum, tee_count):
+    return tee_sum / tee_count
+
+
+class SharedTeeTest(TestCase):
+
+    def test_branches(self):
+        pulled.clear()
+        tee = SharedTee(counted(100), 3, buffer_size=8)
+        a, b, c = tee.branch(), tee.branch(), tee.branch()
+        self.assertRaises(ValueError, tee.branch)
+        self.assertEqual(list(a), list(range(100)))
+        self.assertEqual(list(b), list(range(100)))
+        self.assertEqual(list(c), list(range(100)))
+        self.assertEqual(pulled, list(range(100)))
+        self.assertEqual(tee.buffered, 0)
+
+    def test_bounded_with_spill(self):
+        tee = SharedTee(range(10000), 2, buffer_size=16)
+        a, b = tee.branch(), tee.branch()
+        for _ in range(5000):
+            next(a)
+            self.assertLessEqual(tee.buffered, 16)
+        self.assertGreater(tee.spilled, 0)
+        self.assertEqual(list(b), list(range(10000)))
+        self.assertEqual(list(a), list(range(5000, 10000)))
+
+    def test_interleaved(self):
+        tee = SharedTee(range(1000), 2, buffer_size=4)
+        a, b = tee.branch(), tee.branch()
+        self.assertEqual([x + y for x, y in zip(a, b)], [2 * i for i in range(1000)])
+        self.assertEqual(tee.spilled, 0)
+
+    def test_waits_without_spill(self):
+        tee = SharedTee(range(1000), 2, buffer_size=4, spill=False)
+        results = [None, None]
+
+        def consume(i, branch):
+            results[i] = list(branch)
+
+        threads = [Thread(target=consume, args=(i, tee.branch())) for i in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [list(range(1000))] * 2)
+        self.assertEqual(tee.spilled, 0)
+
+    def test_released_branch(self):
+        tee = SharedTee(range(100), 2, buffer_size=4, spill=False)
+        a, b = tee.branch(), tee.branch()
+        b.close()
+        self.assertEqual(list(a), list(range(100)))
+
+    def test_error_reaches_all_branches(self):
+        def broken():
+            yield 1
+            raise ValueError("broken")
+
+        tee = SharedTee(broken(), 2)
+        a, b = tee.branch(), tee.branch()
+        self.assertRaises(ValueError, list, a)
+        self.assertEqual(next(b), 1)
+        self.assertRaises(ValueError, next, b)
+
+    def test_runners(self):
+        for runner in (SimpleRunner(), ThreadingRunner(), AsyncRunner()):
+            runner.TEE_BUFFER_SIZE = 16
+            with self.subTest(runner=type(runner).__name__):
+                pulled.clear()
+                self.assertEqual(TaskMaster(runner).execute({}, tee_mean).data, 499.5)
+                self.assertEqual(pulled, list(range(1000)))
@@ -0,0 +1,50 @@
+import json
+import os
+import tempfile
+from unittest import TestCase
+
+from stem import tracing
+from stem.task_master import TaskMaster
+from stem.task_runner import SimpleRunner, ThreadingRunner, AsyncRunner, ProcessingRunner
+from stem.tracing import Tracer
+from tests.example_task import int_scale
+
+
+class TracerTest(TestCase):
+
+    def test_inactive(self):
+        self.assertIsNone(tracing.active())
+        self.assertIs(tracing.span("a", "b"), tracing.span("c", "d"))
+
+    def _trace(self, runner):
+        with Tracer() as tracer:
+            list(TaskMaster(runner).execute({}, int_scale).data)
+        self.assertIsNone(tracing.active())
+        return tracer
+
+    def test_runners(self):
+        for runner in [SimpleRunner(), ThreadingRunner(), AsyncRunner(), ProcessingRunner(max_workers=2)]:
+            with self.subTest(type(runner).__name__):
+                events = self._trace(runner).events
+                categories = {(event["cat"], event["name"]) for event in events}
+                for category in ["resolve", "verify", "run"]:
+                    self.assertIn(category, {category for category, _ in categories})
+                for name in ["example_task.int_range", "example_task.data_scale", "example_task.int_scale"]:
+                    self.assertIn(("transform", name), categories)
+                for event in events:
+                    self.assertGreaterEqual(event["dur"], 0)
+
+    def test_process_ids(self):
+        events = self._trace(ProcessingRunner(max_workers=2)).events
+        pids = {event["pid"] for event in events if event["cat"] == "transform"}
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_export(self):
+        tracer = self._trace(ThreadingRunner())
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "trace.json")
+            tracer.export(path)
+            with open(path) as file:
+                trace = json.load(file)
+        phases = {event["ph"] for event in trace["traceEvents"]}
+        self.assertSetEqual({"X", "M"}, phases)
@@ -1,7 +1,9 @@
+import pickle
 from unittest import TestCase
 
-from stem.workspace import Workspace, IWorkspace, ProxyTask, LocalWorkspace
-from tests.example_task import int_range
+from stem.workspace import Workspace, IWorkspace, ProxyTask, LocalWorkspace, TaskReference, invalidate_workspaces
+from tests import example_task
+from tests.example_task import int_range, int_scale
 from tests.example_workspace import IntWorkspace, SubWorkspace, SubSubWorkspace
 
 
@@ -65,3 +67,65 @@ class WorkspaceTest(TestCase):
                                                'tasks': ['sub_sub_int_range'],
                                                'workspaces': []}]}]}
         self.assertDictEqual(ref, IntWorkspace.structure())
+
+    def test_task_reference(self):
+        for task, workspace in [(int_range, Workspace.find_default_workspace(int_range)),
+                                (IntWorkspace.int_range_from_class, IntWorkspace)]:
+            with self.subTest(task.name):
+                reference = pickle.loads(pickle.dumps(TaskReference.of(task, workspace)))
+                self.assertIsNone(reference.task)
+                self.assertEqual(workspace.name, reference.resolve_workspace().name)
+                self.assertListEqual(list(range(10)), list(reference.resolve().transform({})))
+
+    def test_task_index(self):
+        self.assertIs(IntWorkspace.find_task("SubWorkspace.int_reduce"), SubWorkspace.find_task("int_reduce"))
+        self.assertIsNotNone(IntWorkspace.find_task("SubWorkspace.SubSubWorkspace.sub_sub_int_range"))
+        self.assertIsNotNone(IntWorkspace.find_task("SubWorkspace.sub_sub_int_range"))
+        self.assertIsNone(IntWorkspace.find_task("NoWorkspace.int_reduce"))
+        self.assertIsNone(IntWorkspace.find_task("no_task"))
+        self.assertIs(IntWorkspace.get_workspace("SubWorkspace"), SubWorkspace)
+        self.assertIsNone(IntWorkspace.get_workspace("SubSubWorkspace"))
+
+    def test_leaf_found_in_any_sub_workspace(self):
+        # a sub-workspace without the task must not hide it when it is scanned after the one which has it
+        for workspaces in [(LocalWorkspace("a", {"int_range": int_range}), LocalWorkspace("b")),
+                           (LocalWorkspace("b"), LocalWorkspace("a", {"int_range": int_range}))]:
+            workspace = LocalWorkspace("root", {}, list(workspaces))
+            self.assertIs(workspace.find_task("int_range"), int_range)
+
+    def test_invalidate(self):
+        tasks = {"int_range": int_range}
+        workspace = LocalWorkspace("local", tasks)
+        self.assertIsNone(workspace.find_task("int_scale"))
+        tasks["int_scale"] = int_scale
+        self.assertIsNone(workspace.find_task("int_scale"))
+        workspace.invalidate()
+        self.assertIs(workspace.find_task("int_scale"), int_scale)
+
+        parent = LocalWorkspace("parent", {}, [workspace])
+        self.assertIs(parent.find_task("local.int_scale"), int_scale)
+        tasks.pop("int_scale")
+        # the parent flattened the index of the workspace into its own
+        workspace.invalidate()
+        self.assertIsNone(parent.find_task("local.int_scale"))
+        tasks["int_scale"] = int_scale
+        invalidate_workspaces()
+        self.assertIs(parent.find_task("local.int_scale"), int_scale)
+
+    def test_module_workspace_cached(self):
+        workspace = IWorkspace.module_workspace(example_task)
+        self.assertIs(workspace, IWorkspace.module_workspace(example_task))
+        self.assertIs(workspace, Workspace.find_default_workspace(int_range))
+        invalidate_workspaces()
+        self.assertIsNot(workspace, IWorkspace.module_workspace(example_task))
+
+    def test_module_workspace_rebound(self):
+        workspace = IWorkspace.module_workspace(example_task)
+        original = example_task.int_scale
+        try:
+            example_task.int_scale = int_range  # the same number of names
+            self.assertIs(IWorkspace.module_workspace(example_task).find_task("int_scale"), int_range)
+        finally:
+            example_task.int_scale = original
+            workspace.invalidate()
+        self.assertIs(IWorkspace.module_workspace(example_task).find_task("int_scale"), original)